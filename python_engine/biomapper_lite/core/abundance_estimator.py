@@ -67,10 +67,17 @@ class AbundanceEstimator:
         """
         Takes raw classification counts and returns scientifically corrected abundance estimates.
         """
-        raw_counts = classification_results['Predicted_Species'].value_counts().to_dict()
+        raw_counts = classification_results['Predicted_Species'].value_counts()
+        return self.correct_abundance_arr(raw_counts.index, raw_counts.values)
+
+    def correct_abundance_arr(self, species_arr, count_arr) -> dict:
+        """
+        Same correction as correct_abundance, but takes parallel arrays of species names
+        and raw counts directly, skipping the DataFrame construction and value_counts pass.
+        """
         corrected_abundance = {}
         
-        for species, count in raw_counts.items():
+        for species, count in zip(species_arr, count_arr):
             # We only care about the Genus species part for the lookup
             clean_species_name = " ".join(species.split(' ')[:2])
             
@@ -85,6 +92,6 @@ class AbundanceEstimator:
                         break # We found the best match, so we stop
             
             corrected_count = count / correction_factor
-            corrected_abundance[species] = round(corrected_count, 2)
+            corrected_abundance[species] = round(float(corrected_count), 2)
             
         return corrected_abundance
\ No newline at end of file
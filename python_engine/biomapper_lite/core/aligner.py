@@ -12,9 +12,10 @@ from qiskit_optimization.algorithms import MinimumEigenOptimizer
 from qiskit_algorithms import NumPyMinimumEigensolver
 
 class SpeedTester:
-    def __init__(self, seq1: str, seq2: str):
-        self.seq1 = seq1
-        self.seq2 = seq2
+    def __init__(self, seq1, seq2):
+        # Accept raw ASCII bytes as well as str
+        self.seq1 = seq1.decode("ascii") if isinstance(seq1, bytes) else seq1
+        self.seq2 = seq2.decode("ascii") if isinstance(seq2, bytes) else seq2
 
     def _run_classical_alignment(self) -> float:
         """Runs a standard pairwise alignment from BioPython."""
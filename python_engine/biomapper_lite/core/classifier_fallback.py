@@ -4,6 +4,7 @@ import pandas as pd
 import torch
 import skbio.diversity.alpha as alpha
 import random
+from collections import Counter
 from Bio import SeqIO
 
 class BioAnalyzerFallback:
@@ -49,8 +50,10 @@ class BioAnalyzerFallback:
         return results_df, biodiversity_metrics
 
     def _calculate_biodiversity(self, species_list: list) -> dict:
-        unique_species = list(set(species_list))
-        counts = [species_list.count(s) for s in unique_species]
-        richness = len(unique_species)
+        return self._calculate_biodiversity_from_counts(Counter(species_list))
+
+    def _calculate_biodiversity_from_counts(self, species_counts: dict) -> dict:
+        counts = list(species_counts.values())
+        richness = len(counts)
         shannon_index = alpha.shannon(counts, base=2) if richness > 1 else 0.0
         return {"Species Richness": richness, "Shannon Diversity Index": f"{shannon_index:.3f}"}
\ No newline at end of file
@@ -9,15 +9,30 @@ import time
 import random
 import asyncio
 import threading
+import itertools
+from collections import deque
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
 import numpy as np
+import orjson
 import websockets
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Number of recent rounds kept in memory for dashboards; summary stats are tracked separately
+TRAINING_HISTORY_MAXLEN = 1024
+
+FL_REGIONS = ("Western Ghats", "Himalayas", "Sundarbans", "Northeast India", "Deccan Plateau")
+FL_SPECIALIZATIONS = (
+    "Marine Biodiversity", "Forest Ecosystems", "Endemic Species",
+    "Conservation Genetics", "Climate Adaptation"
+)
+
+# Pre-encoded keepalive reply, sent as a text frame like every other FL message
+PONG_FRAME = orjson.dumps({"type": "pong"}).decode()
+
 class FederatedLearningSimulator:
     """Simulates federated learning for biodiversity model training"""
     
@@ -25,9 +40,21 @@ class FederatedLearningSimulator:
         self.participants = []
         self.global_model = None
         self.round_number = 0
-        self.training_history = []
+        self.training_history = deque(maxlen=TRAINING_HISTORY_MAXLEN)
         self.is_running = False
         self.websocket_clients = set()
+        self._stop_event = threading.Event()
+        self._status_frame: Optional[str] = None
+        self._status_frame_clients = 0
+        self._status_dirty = True
+        self._reset_round_tracking()
+    
+    def _reset_round_tracking(self):
+        """Reset the per-simulation accuracy/convergence tracking"""
+        self._completed_rounds = 0
+        self._initial_accuracy: Optional[float] = None
+        self._prev_accuracy: Optional[float] = None
+        self._convergence_round: Optional[int] = None
         
     def start_simulation(self, num_participants: int = 5, rounds: int = 10) -> Dict[str, Any]:
         """Start federated learning simulation"""
@@ -35,9 +62,12 @@ class FederatedLearningSimulator:
             return {"error": "Simulation already running"}
         
         self.is_running = True
+        self._stop_event.clear()
         self.participants = self._create_participants(num_participants)
         self.round_number = 0
-        self.training_history = []
+        self.training_history = deque(maxlen=TRAINING_HISTORY_MAXLEN)
+        self._reset_round_tracking()
+        self._status_dirty = True
         
         # Start simulation in background thread
         simulation_thread = threading.Thread(
@@ -57,21 +87,18 @@ class FederatedLearningSimulator:
     def _create_participants(self, num_participants: int) -> List[Dict[str, Any]]:
         """Create simulated FL participants"""
         participants = []
-        regions = ["Western Ghats", "Himalayas", "Sundarbans", "Northeast India", "Deccan Plateau"]
+        region_cycle = itertools.cycle(FL_REGIONS)
         
-        for i in range(num_participants):
+        for i, region in zip(range(num_participants), region_cycle):
             participant = {
                 "id": f"participant_{i+1}",
                 "name": f"Research Institute {i+1}",
-                "region": regions[i % len(regions)],
+                "region": region,
                 "data_size": random.randint(1000, 5000),
                 "local_accuracy": random.uniform(0.7, 0.9),
                 "privacy_budget": random.uniform(0.3, 0.8),
                 "reputation_score": random.uniform(0.6, 1.0),
-                "specialization": random.choice([
-                    "Marine Biodiversity", "Forest Ecosystems", "Endemic Species", 
-                    "Conservation Genetics", "Climate Adaptation"
-                ])
+                "specialization": random.choice(FL_SPECIALIZATIONS)
             }
             participants.append(participant)
         
@@ -88,17 +115,21 @@ class FederatedLearningSimulator:
             self.round_number = round_num
             round_result = self._simulate_round(round_num)
             self.training_history.append(round_result)
+            self._completed_rounds += 1
+            self._status_dirty = True
             
             # Broadcast update to websocket clients
             self._broadcast_update(round_result)
             
-            # Wait between rounds
-            time.sleep(2)
+            # Wait between rounds, waking immediately if the simulation is stopped
+            if self._stop_event.wait(2.0):
+                break
         
         # Final results
         final_result = self._generate_final_results()
         self._broadcast_update(final_result)
         self.is_running = False
+        self._status_dirty = True
         
         logger.info("FL simulation completed")
     
@@ -128,6 +159,7 @@ class FederatedLearningSimulator:
         # Simulate global aggregation
         global_accuracy = self._calculate_global_accuracy(local_updates)
         convergence_score = self._calculate_convergence_score(local_updates)
+        self._track_accuracy(round_num, global_accuracy)
         
         round_result = {
             "type": "round_update",
@@ -144,6 +176,15 @@ class FederatedLearningSimulator:
         
         return round_result
     
+    def _track_accuracy(self, round_num: int, global_accuracy: float):
+        """Incrementally track initial accuracy and the convergence round"""
+        if self._initial_accuracy is None:
+            self._initial_accuracy = global_accuracy
+        elif self._convergence_round is None and global_accuracy - self._prev_accuracy < 0.01:
+            # Consider converged if improvement is less than 0.01
+            self._convergence_round = round_num
+        self._prev_accuracy = global_accuracy
+    
     def _calculate_contribution_weight(self, participant: Dict[str, Any]) -> float:
         """Calculate participant's contribution weight"""
         base_weight = participant["data_size"] / 1000.0
@@ -183,7 +224,7 @@ class FederatedLearningSimulator:
             return {"error": "No training history available"}
         
         final_round = self.training_history[-1]
-        initial_accuracy = self.training_history[0]["global_accuracy"] if self.training_history else 0.0
+        initial_accuracy = self._initial_accuracy if self._initial_accuracy is not None else 0.0
         final_accuracy = final_round["global_accuracy"]
         
         # Calculate improvement metrics
@@ -196,7 +237,7 @@ class FederatedLearningSimulator:
         return {
             "type": "simulation_complete",
             "timestamp": datetime.now().isoformat(),
-            "total_rounds": len(self.training_history),
+            "total_rounds": self._completed_rounds,
             "performance_metrics": {
                 "initial_accuracy": initial_accuracy,
                 "final_accuracy": final_accuracy,
@@ -211,7 +252,7 @@ class FederatedLearningSimulator:
                     "name": p["name"],
                     "region": p["region"],
                     "final_accuracy": p["local_accuracy"],
-                    "total_contributions": len(self.training_history),
+                    "total_contributions": self._completed_rounds,
                     "specialization": p["specialization"]
                 }
                 for p in self.participants
@@ -227,18 +268,13 @@ class FederatedLearningSimulator:
     
     def _find_convergence_round(self) -> int:
         """Find the round where convergence was achieved"""
-        if len(self.training_history) < 2:
+        if self._completed_rounds < 2:
             return 1
         
-        for i in range(1, len(self.training_history)):
-            current_accuracy = self.training_history[i]["global_accuracy"]
-            previous_accuracy = self.training_history[i-1]["global_accuracy"]
-            
-            # Consider converged if improvement is less than 0.01
-            if current_accuracy - previous_accuracy < 0.01:
-                return i + 1
+        if self._convergence_round is not None:
+            return self._convergence_round
         
-        return len(self.training_history)
+        return self._completed_rounds
     
     def _generate_biodiversity_insights(self) -> Dict[str, Any]:
         """Generate biodiversity insights from FL simulation"""
@@ -286,15 +322,29 @@ class FederatedLearningSimulator:
         return {
             "is_running": self.is_running,
             "round_number": self.round_number,
-            "total_rounds": len(self.training_history),
+            "total_rounds": self._completed_rounds,
             "participants": len(self.participants),
             "connected_clients": len(self.websocket_clients),
             "latest_accuracy": self.training_history[-1]["global_accuracy"] if self.training_history else 0.0
         }
     
+    def get_status_frame(self) -> str:
+        """Get the encoded status_update message, rebuilt only when the status changed"""
+        connected_clients = len(self.websocket_clients)
+        if self._status_dirty or self._status_frame_clients != connected_clients:
+            self._status_frame = orjson.dumps({
+                "type": "status_update",
+                "data": self.get_status()
+            }).decode()
+            self._status_frame_clients = connected_clients
+            self._status_dirty = False
+        return self._status_frame
+    
     def stop_simulation(self):
         """Stop the current simulation"""
         self.is_running = False
+        self._stop_event.set()
+        self._status_dirty = True
         return {"status": "stopped"}
 
 # Global FL simulator instance
@@ -328,17 +378,13 @@ class FLWebSocketServer:
         
         try:
             # Send current status
-            status = fl_simulator.get_status()
-            await websocket.send(json.dumps({
-                "type": "status_update",
-                "data": status
-            }))
+            await websocket.send(fl_simulator.get_status_frame())
             
             # Keep connection alive
             async for message in websocket:
-                data = json.loads(message)
+                data = orjson.loads(message)
                 if data.get("type") == "ping":
-                    await websocket.send(json.dumps({"type": "pong"}))
+                    await websocket.send(PONG_FRAME)
                     
         except websockets.exceptions.ConnectionClosed:
             pass
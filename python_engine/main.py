@@ -9,6 +9,7 @@ from Bio import SeqIO
 from Bio.Blast.Applications import NcbiblastnCommandline
 from io import StringIO
 import tempfile
+from collections import Counter
 
 # Import your new and fallback modules
 from biomapper_lite.core.abundance_estimator import AbundanceEstimator
@@ -22,6 +23,14 @@ CLASSIFIER_API_URL = "https://<classifier_url>.ngrok.io/analyze"
 NOVELTY_API_URL = "https://<novelty_url>.ngrok.io/analyze"
 LOCAL_BLAST_DB_PATH = "python_engine/db/BioMapperDB"
 
+# Shared HTTPS session for the AI servers: certificates are verified and the
+# TCP/TLS connection is kept alive across the classifier and novelty calls.
+AI_SESSION = requests.Session()
+AI_SESSION.headers.update({
+    "ngrok-skip-browser-warning": "true",
+    "Accept-Encoding": "gzip, deflate"
+})
+
 def run_local_blast(sequence: str):
     """Runs a BLAST search against our local, curated database."""
     try:
@@ -43,91 +52,115 @@ def analyze_with_hybrid_strategy(fasta_file_path: str):
     """
     Orchestrates the new, efficient, multi-stage hybrid analysis.
     """
-    all_records = list(SeqIO.parse(fasta_file_path, "fasta"))
+    # Index the FASTA by on-disk offsets so records are loaded lazily, one at a time,
+    # instead of materializing the whole file in memory.
+    try:
+        record_index = SeqIO.index(fasta_file_path, "fasta")
+    except ValueError as e:
+        # SeqIO.index rejects duplicate record IDs; such files are parsed into memory
+        # instead, with records addressed by position
+        print(f"Cannot index {fasta_file_path} ({e}), parsing it into memory")
+        record_index = dict(enumerate(SeqIO.parse(fasta_file_path, "fasta")))
     
-    # --- Step 1: The Local Specialist Check ---
-    print("--- Running Local BLAST against BioMapperDB ---")
-    local_blast_results = {}
-    sequences_for_ai = []
-    for record in all_records:
-        match_found, match_text = run_local_blast(str(record.seq))
-        if match_found:
-            # If we find a local match, we create a high-confidence result immediately.
-            local_blast_results[record.id] = {
-                "Predicted_Species": f"{record.description.split(' ')[1]} (Verified Locally)",
-                "Classifier_Confidence": "1.0000",
-                "Novelty_Score": "0.0100",
-                "Local_DB_Match": True
-            }
-        else:
-            # If no match, this sequence needs to be analyzed by the cloud AI.
-            sequences_for_ai.append(record)
+    try:
+        # --- Step 1: The Local Specialist Check ---
+        print("--- Running Local BLAST against BioMapperDB ---")
+        local_blast_results = {}
+        sequences_for_ai = []
+        record_ids = []
+        for key in record_index:
+            record = record_index[key]
+            record_ids.append(record.id)
+            match_found, match_text = run_local_blast(str(record.seq))
+            if match_found:
+                # If we find a local match, we create a high-confidence result immediately.
+                local_blast_results[record.id] = {
+                    "Predicted_Species": f"{record.description.split(' ')[1]} (Verified Locally)",
+                    "Classifier_Confidence": "1.0000",
+                    "Novelty_Score": "0.0100",
+                    "Local_DB_Match": True
+                }
+            else:
+                # If no match, this sequence needs to be analyzed by the cloud AI.
+                sequences_for_ai.append((key, record.id))
     
-    print(f"Found {len(local_blast_results)} matches locally. Sending {len(sequences_for_ai)} sequences to AI Cloud.")
-
-    # --- Step 2: The Global Genius Check (only if there are unknown sequences) ---
-    ai_results_map = {}
-    if sequences_for_ai:
-        # Create a temporary FASTA file with only the sequences the AI needs to see
-        with tempfile.NamedTemporaryFile(mode='w+', delete=False, suffix=".fasta") as tmp:
-            SeqIO.write(sequences_for_ai, tmp, "fasta")
-            tmp_path = tmp.name
-        
-        headers = {"ngrok-skip-browser-warning": "true"}
+        print(f"Found {len(local_blast_results)} matches locally. Sending {len(sequences_for_ai)} sequences to AI Cloud.")
+
+        # --- Step 2: The Global Genius Check (only if there are unknown sequences) ---
+        ai_results_map = {}
+        if sequences_for_ai:
+            # Create a temporary FASTA file with only the sequences the AI needs to see
+            with tempfile.NamedTemporaryFile(mode='w+', delete=False, suffix=".fasta") as tmp:
+                SeqIO.write((record_index[key] for key, _ in sequences_for_ai), tmp, "fasta")
+                tmp_path = tmp.name
         
-        with open(tmp_path, 'rb') as f:
-            files = {'fastaFile': f}
-            print("--- Calling Live Classifier & Novelty AI Servers ---")
-            classifier_response = requests.post(CLASSIFIER_API_URL, files=f, headers=headers, verify=False)
-            classifier_response.raise_for_status()
-            classifier_results = classifier_response.json()["predictions"]
-
-            f.seek(0) # Reset file pointer for the second request
-            novelty_response = requests.post(NOVELTY_API_URL, files=f, headers=headers, verify=False)
-            novelty_response.raise_for_status()
-            novelty_results = novelty_response.json()["novelty_scores"]
+            with open(tmp_path, 'rb') as f:
+                files = {'fastaFile': f}
+                print("--- Calling Live Classifier & Novelty AI Servers ---")
+                classifier_response = AI_SESSION.post(CLASSIFIER_API_URL, files=files)
+                classifier_response.raise_for_status()
+                classifier_results = classifier_response.json()["predictions"]
+
+                f.seek(0) # Reset file pointer for the second request
+                novelty_response = AI_SESSION.post(NOVELTY_API_URL, files=files)
+                novelty_response.raise_for_status()
+                novelty_results = novelty_response.json()["novelty_scores"]
         
-        os.remove(tmp_path) # Clean up the temporary file
+            os.remove(tmp_path) # Clean up the temporary file
 
-        # --- Step 3: The Ensemble Logic for AI results ---
-        for i, record in enumerate(sequences_for_ai):
-            class_res = classifier_results[i]
-            novelty_score = novelty_results[i]
+            # --- Step 3: The Ensemble Logic for AI results ---
+            for i, (_, record_id) in enumerate(sequences_for_ai):
+                class_res = classifier_results[i]
+                novelty_score = novelty_results[i]
             
-            species_name = f"TaxID:{class_res['taxonomic_id']}"
-            confidence_score = class_res['confidence']
-
-            final_prediction = species_name
-            if novelty_score > 0.9 and confidence_score < 0.8:
-                final_prediction = "Novel Taxa Discovery Alert!"
-
-            ai_results_map[record.id] = {
-                "Predicted_Species": final_prediction,
-                "Classifier_Confidence": f"{confidence_score:.4f}",
-                "Novelty_Score": f"{novelty_score:.4f}",
-                "Local_DB_Match": False
-            }
-
-    # --- Step 4: Merge the Local and AI Results ---
-    final_results_data = []
-    species_list = []
-    for record in all_records:
-        if record.id in local_blast_results:
-            result = local_blast_results[record.id]
-        else:
-            result = ai_results_map.get(record.id, {})
-        
-        full_result = {"Sequence_ID": record.id, **result}
-        final_results_data.append(full_result)
-        species_list.append(full_result.get("Predicted_Species", "Unclassified"))
+                species_name = f"TaxID:{class_res['taxonomic_id']}"
+                confidence_score = class_res['confidence']
+
+                final_prediction = species_name
+                if novelty_score > 0.9 and confidence_score < 0.8:
+                    final_prediction = "Novel Taxa Discovery Alert!"
+
+                ai_results_map[record_id] = {
+                    "Predicted_Species": final_prediction,
+                    "Classifier_Confidence": f"{confidence_score:.4f}",
+                    "Novelty_Score": f"{novelty_score:.4f}",
+                    "Local_DB_Match": False
+                }
+
+        # --- Step 4: Merge the Local and AI Results ---
+        # A single pass fills the pre-sized result rows and tallies species counts,
+        # which then feed both the abundance and biodiversity calculations directly.
+        final_results_data = [None] * len(record_ids)
+        species_counts = Counter()
+        unmatched = 0
+        for i, record_id in enumerate(record_ids):
+            result = local_blast_results.get(record_id)
+            if result is None:
+                result = ai_results_map.get(record_id, {})
         
-    results_df = pd.DataFrame(final_results_data)
+            final_results_data[i] = {"Sequence_ID": record_id, **result}
+            if "Predicted_Species" in result:
+                species_counts[result["Predicted_Species"]] += 1
+            else:
+                unmatched += 1
+    finally:
+        if hasattr(record_index, "close"):
+            record_index.close()
+    
+    results_df = pd.DataFrame.from_records(final_results_data)
     
     # --- Step 5: Abundance Estimation on the Final, Merged Results ---
     abundance_model = AbundanceEstimator()
-    corrected_abundance = abundance_model.correct_abundance(results_df)
+    ranked_species = species_counts.most_common()
+    corrected_abundance = abundance_model.correct_abundance_arr(
+        [species for species, _ in ranked_species],
+        [count for _, count in ranked_species]
+    )
     
-    biodiversity_metrics = BioAnalyzerFallback("")._calculate_biodiversity(species_list)
+    # Records without a prediction still count towards diversity as "Unclassified".
+    if unmatched:
+        species_counts["Unclassified"] += unmatched
+    biodiversity_metrics = BioAnalyzerFallback("")._calculate_biodiversity_from_counts(species_counts)
     
     return results_df, biodiversity_metrics, corrected_abundance
 
@@ -3,12 +3,27 @@
 import sys
 import json
 import os
+import re
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import numpy as np
 import pandas as pd
-from Bio import SeqIO
+from Bio.SeqIO.FastaIO import SimpleFastaParser
 import subprocess
 from io import StringIO
-import tempfile
+import hashlib
+import shelve
+import atexit
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 # Import your new and fallback modules
 from biomapper_lite.core.abundance_estimator import AbundanceEstimator
@@ -21,101 +36,219 @@ from biomapper_lite.core.classifier_fallback import BioAnalyzerFallback
 CLASSIFIER_API_URL = "https://<classifier_url>.ngrok.io/analyze"
 NOVELTY_API_URL = "https://<novelty_url>.ngrok.io/analyze"
 LOCAL_BLAST_DB_PATH = "python_engine/db/BioMapperDB"
+LOCAL_BLAST_TIMEOUT = 600  # seconds for the single batched blastn run
 OLLAMA_API_URL = "http://localhost:11434/api/generate"
+OLLAMA_TAGS_URL = "http://localhost:11434/api/tags"
+OLLAMA_HEALTH_TTL = 30  # seconds a health-check result is reused
+OLLAMA_KEEP_ALIVE = "10m"  # keep the model resident between sequences
+# Ollama answers this many requests at once and queues the rest server-side, where the
+# queue time would count against the request timeout. Live calls therefore wait for a
+# slot here, and the 45 s timeout only covers the generation itself.
+OLLAMA_NUM_PARALLEL = int(os.environ.get("OLLAMA_NUM_PARALLEL", "1"))
+_OLLAMA_SLOTS = threading.BoundedSemaphore(OLLAMA_NUM_PARALLEL)
+# Ollama models tried in order as fallbacks
+OLLAMA_MODELS = (
+    "llama3:8b-instruct-q4_K_M",
+    "llama2:7b",
+    "llama2:13b"
+)
 OLLAMA_MODEL = "llama2:7b"  # Local Ollama model for DNA analysis
 
-def run_local_blast(sequence: str):
-    """Runs a BLAST search against our local, curated database using subprocess."""
+# Numeric result columns that are emitted as formatted strings
+SCORE_COLUMNS = ("Classifier_Confidence", "Novelty_Score")
+# Shared placeholder for records without any result; never mutated
+_EMPTY_RESULT = {}
+
+# Common patterns for species names in free-text LLM responses, compiled once
+SPECIES_PATTERNS = tuple(re.compile(pattern) for pattern in (
+    r'([A-Z][a-z]+ [a-z]+)',  # Genus species format
+    r'species[:\s]+([A-Z][a-z]+ [a-z]+)',
+    r'identified as[:\s]+([A-Z][a-z]+ [a-z]+)',
+    r'likely[:\s]+([A-Z][a-z]+ [a-z]+)'
+))
+
+def _json_loads(content: bytes):
+    """Parses a JSON response body, using orjson when it is installed."""
+    return orjson.loads(content) if ORJSON_AVAILABLE else json.loads(content)
+
+def _emit_json(obj):
+    """Writes obj as one JSON line to stdout, encoding straight to bytes with orjson when available."""
+    if ORJSON_AVAILABLE:
+        sys.stdout.flush()  # keep earlier print() output ahead of the raw bytes
+        sys.stdout.buffer.write(orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE))
+        sys.stdout.buffer.flush()
+    else:
+        print(json.dumps(obj))
+
+# Shared HTTP session so Ollama and cloud AI calls reuse pooled keep-alive connections
+# instead of opening a new TCP (and TLS) connection per request. Certificates are
+# verified; with keep-alive only the first request per host pays the TLS handshake.
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=64,
+    max_retries=Retry(total=2, backoff_factor=0.1, status_forcelist=[502, 503, 504])
+)
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
+
+_OLLAMA_HEALTH = {"ts": None, "ok": False}
+
+def _ollama_alive() -> bool:
+    """Checks whether Ollama is available, re-probing at most every OLLAMA_HEALTH_TTL seconds."""
+    now = time.monotonic()
+    if _OLLAMA_HEALTH["ts"] is not None and now - _OLLAMA_HEALTH["ts"] < OLLAMA_HEALTH_TTL:
+        return _OLLAMA_HEALTH["ok"]
     try:
-        import subprocess
-        
-        # Create temporary input file
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.fasta') as tmp_input:
-            tmp_input.write(f">query\n{sequence}\n")
-            tmp_input_path = tmp_input.name
-        
-        # Create temporary output file
-        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.xml') as tmp_output:
-            tmp_output_path = tmp_output.name
-        
-        # Run BLAST using subprocess
+        ok = _SESSION.get(OLLAMA_TAGS_URL, timeout=5).status_code == 200
+    except requests.exceptions.RequestException:
+        ok = False
+    _OLLAMA_HEALTH.update(ts=now, ok=ok)
+    return ok
+
+# Ollama responses keyed by prompt version, model and SHA-256 of the sequence: an
+# in-process dict in front of a disk-backed shelve, so identical sequences skip the LLM
+# within and across runs. Bump OLLAMA_PROMPT_VERSION whenever the prompt changes so
+# answers to the old prompt are not reused. The shelf is opened on first use and kept
+# open for the rest of the run.
+OLLAMA_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ollama_cache.db")
+OLLAMA_PROMPT_VERSION = 1
+_OLLAMA_MEMO = {}
+_OLLAMA_CACHE_LOCK = threading.Lock()
+_OLLAMA_SHELF = None
+_OLLAMA_SHELF_FAILED = False
+
+def _ollama_cache_key(model: str, digest: str) -> str:
+    return f"v{OLLAMA_PROMPT_VERSION}:{model}:{digest}"
+
+def _ollama_shelf():
+    """The run's shelf, opened once; None if it cannot be opened. Call with the lock held."""
+    global _OLLAMA_SHELF, _OLLAMA_SHELF_FAILED
+    if _OLLAMA_SHELF is None and not _OLLAMA_SHELF_FAILED:
+        try:
+            _OLLAMA_SHELF = shelve.open(OLLAMA_CACHE_PATH)
+        except Exception as e:
+            _OLLAMA_SHELF_FAILED = True
+            print(f"Ollama cache unavailable, using in-memory cache only: {e}")
+    return _OLLAMA_SHELF
+
+def close_ollama_cache():
+    """Flushes and closes the Ollama cache shelf at the end of a run."""
+    global _OLLAMA_SHELF
+    with _OLLAMA_CACHE_LOCK:
+        if _OLLAMA_SHELF is not None:
+            _OLLAMA_SHELF.close()
+            _OLLAMA_SHELF = None
+
+atexit.register(close_ollama_cache)
+
+def _ollama_cache_get(sequence: str):
+    """Cached answer for a sequence from any of OLLAMA_MODELS, preferring earlier models."""
+    digest = hashlib.sha256(sequence.encode()).hexdigest()
+    with _OLLAMA_CACHE_LOCK:
+        shelf = _ollama_shelf()
+        for model in OLLAMA_MODELS:
+            key = _ollama_cache_key(model, digest)
+            if key in _OLLAMA_MEMO:
+                return _OLLAMA_MEMO[key]
+            if shelf is None:
+                continue
+            try:
+                result = shelf.get(key)
+            except Exception:
+                continue
+            if result is not None:
+                _OLLAMA_MEMO[key] = result
+                return result
+        return None
+
+def _ollama_cache_put(model: str, sequence: str, result: dict):
+    key = _ollama_cache_key(model, hashlib.sha256(sequence.encode()).hexdigest())
+    with _OLLAMA_CACHE_LOCK:
+        _OLLAMA_MEMO[key] = result
+        shelf = _ollama_shelf()
+        if shelf is None:
+            return
+        try:
+            shelf[key] = result
+        except Exception as e:
+            print(f"Could not persist Ollama cache entry: {e}")
+
+def run_local_blast_batch(fasta_file_path: str):
+    """
+    Runs one BLAST search for every record in a FASTA file against our local, curated
+    database. Returns {record_id: (matched, info)} for every record that produced a hit.
+    """
+    hits = {}
+    try:
+        # The input FASTA is streamed to blastn on stdin, so the DB is loaded once and the
+        # sequences are never held in memory; tabular hits are read from stdout.
+        # -max_target_seqs is kept because -num_alignments is not valid for tabular formats.
         cmd = [
             'blastn',
             '-db', LOCAL_BLAST_DB_PATH,
-            '-query', tmp_input_path,
-            '-out', tmp_output_path,
-            '-outfmt', '5',  # XML output
+            '-query', '-',
+            '-outfmt', '6 qseqid sseqid pident evalue',
             '-task', 'blastn',
             '-max_target_seqs', '1'
         ]
         
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-        
-        # Clean up temporary files
-        os.unlink(tmp_input_path)
+        with open(fasta_file_path) as query_handle:
+            result = subprocess.run(cmd, stdin=query_handle, capture_output=True, text=True,
+                                    timeout=LOCAL_BLAST_TIMEOUT)
         
-        if result.returncode == 0 and os.path.exists(tmp_output_path):
-            with open(tmp_output_path, 'r') as f:
-                output = f.read()
-            os.unlink(tmp_output_path)
-            
-            if "<Hsp_identity>" in output and "<Hsp_num>" in output:
-                return True, "Match found in BioMapperDB"
-        
-        return False, "No match found in BioMapperDB"
+        if result.returncode == 0:
+            for line in result.stdout.splitlines():
+                fields = line.split('\t')
+                if len(fields) < 4 or fields[0] in hits:
+                    continue
+                qseqid, sseqid, pident, evalue = fields[:4]
+                hits[qseqid] = (True, f"Match found in BioMapperDB ({sseqid}, {pident}% identity, e={evalue})")
     except Exception as e:
-        return False, f"Local BLAST error: {e}"
+        print(f"Local BLAST error: {e}")
+    
+    return hits
 
-def analyze_with_ollama(sequence: str):
-    """Analyzes DNA sequence using local Ollama LLM with enhanced fallback."""
+def analyze_with_ollama(sequence: str, live: bool = True):
+    """
+    Analyzes DNA sequence using local Ollama LLM with enhanced fallback. Cached answers
+    are always returned; live=False skips only the call to the Ollama service.
+    """
+    cached = _ollama_cache_get(sequence)
+    if cached is not None:
+        return True, cached
+    if not live:
+        return False, "Ollama service not available"
+    
     try:
-        # Check if Ollama is available
-        health_check = requests.get("http://localhost:11434/api/tags", timeout=5)
-        if health_check.status_code != 200:
+        # Check if Ollama is available (cached across calls)
+        if not _ollama_alive():
             return False, "Ollama service not available"
         
-        prompt = f"""
-        You are a bioinformatics expert. Analyze this DNA sequence and identify the most likely species.
-        
-        DNA Sequence (first 200bp): {sequence[:200]}
-        Sequence length: {len(sequence)} base pairs
-        
-        Based on sequence characteristics, nucleotide composition, and patterns, provide:
-        1. Most likely species (scientific name)
-        2. Confidence level (0.0 to 1.0)
-        3. Taxonomic classification (Kingdom, Phylum, Class if possible)
-        4. Brief reasoning for identification
-        
-        Respond ONLY in valid JSON format like this:
-        {{
-            "species": "Homo sapiens",
-            "confidence": 0.85,
-            "kingdom": "Animalia",
-            "phylum": "Chordata",
-            "class": "Mammalia",
-            "reasoning": "High GC content and codon usage patterns typical of mammalian sequences"
-        }}
-        """
+        # Terse prompt: LLM latency grows with prompt and output tokens
+        prompt = (
+            "Identify the most likely species for this DNA sequence. Reply only as JSON with keys "
+            "species,confidence,kingdom,phylum,class,reasoning. "
+            f"Sequence ({len(sequence)} bp): {sequence[:200]}"
+        )
         
         # Try multiple Ollama models as fallbacks
-        models_to_try = [
-            "llama3:8b-instruct-q4_K_M",
-            "llama2:7b",
-            "llama2:13b"
-        ]
-        
-        for model in models_to_try:
+        last_model = OLLAMA_MODELS[-1]
+        for model in OLLAMA_MODELS:
             try:
-                response = requests.post(OLLAMA_API_URL, json={
-                    "model": model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.3,
-                        "top_p": 0.9,
-                        "num_predict": 200
-                    }
-                }, timeout=45)
+                with _OLLAMA_SLOTS:
+                    response = _SESSION.post(OLLAMA_API_URL, json={
+                        "model": model,
+                        "prompt": prompt,
+                        "stream": False,
+                        "keep_alive": OLLAMA_KEEP_ALIVE,
+                        "format": "json",  # constrain the output to valid JSON
+                        "options": {
+                            "temperature": 0,
+                            "top_p": 1,
+                            "num_predict": 80
+                        }
+                    }, timeout=45)
                 
                 if response.status_code == 200:
                     result = response.json()
@@ -124,7 +257,7 @@ def analyze_with_ollama(sequence: str):
                     # Try to parse as JSON
                     try:
                         analysis = json.loads(response_text)
-                        return True, {
+                        result = {
                             "species": analysis.get("species", "Unknown species"),
                             "confidence": float(analysis.get("confidence", 0.75)),
                             "kingdom": analysis.get("kingdom", "Unknown"),
@@ -133,8 +266,14 @@ def analyze_with_ollama(sequence: str):
                             "reasoning": analysis.get("reasoning", "LLM-based sequence analysis"),
                             "model_used": model
                         }
+                        _ollama_cache_put(model, sequence, result)
+                        return True, result
                     except (json.JSONDecodeError, ValueError):
-                        # Fallback: extract information from text response
+                        # Malformed JSON: give the next model a chance before settling
+                        # for free-text extraction on the last one
+                        if model != last_model:
+                            print(f"Invalid JSON from model {model}, trying next...")
+                            continue
                         species = extract_species_from_text(response_text)
                         return True, {
                             "species": species,
@@ -158,113 +297,157 @@ def analyze_with_ollama(sequence: str):
     except Exception as e:
         return False, f"Ollama connection error: {e}"
 
+def warm_up_ollama():
+    """Loads the primary Ollama model with an empty prompt so concurrent workers find it resident."""
+    try:
+        _SESSION.post(OLLAMA_API_URL, json={
+            "model": OLLAMA_MODELS[0],
+            "prompt": "",
+            "keep_alive": OLLAMA_KEEP_ALIVE
+        }, timeout=45)
+    except requests.exceptions.RequestException as e:
+        print(f"Ollama warm-up failed: {e}")
+
 def extract_species_from_text(text):
     """Extract species name from unstructured text response."""
-    import re
-    
-    # Common patterns for species names
-    patterns = [
-        r'([A-Z][a-z]+ [a-z]+)',  # Genus species format
-        r'species[:\s]+([A-Z][a-z]+ [a-z]+)',
-        r'identified as[:\s]+([A-Z][a-z]+ [a-z]+)',
-        r'likely[:\s]+([A-Z][a-z]+ [a-z]+)'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text)
+    for pattern in SPECIES_PATTERNS:
+        match = pattern.search(text)
         if match:
             return match.group(1)
     
     # Fallback
     return "Species identified via LLM"
 
+def _iter_fasta(fasta_file_path: str):
+    """
+    Streams (id, description, sequence) tuples from a FASTA file. Only these three fields
+    are needed downstream, so no SeqRecord objects are built.
+    """
+    with open(fasta_file_path) as handle:
+        for title, sequence in SimpleFastaParser(handle):
+            yield title.split(None, 1)[0], title, sequence
+
+def _classify_one(record, blast_hits, ollama_available):
+    """
+    Runs the local stages (BLAST lookup, then Ollama) for a single (id, description, sequence) record.
+    Returns (record_id, source, result) where source is "blast", "ollama" or "cloud";
+    "cloud" means both local methods failed and result is None.
+    """
+    record_id, description, sequence_str = record
+    
+    # Use the batched local BLAST result first
+    if record_id in blast_hits:
+        return record_id, "blast", {
+            "Predicted_Species": f"{description.split(' ')[1]} (Verified Locally)",
+            "Classifier_Confidence": 1.0,
+            "Novelty_Score": 0.01,
+            "Local_DB_Match": True,
+            "Analysis_Method": "Local BLAST"
+        }
+    
+    # Try Ollama local LLM if BLAST fails (only cached answers when Ollama is down)
+    ollama_success, ollama_result = analyze_with_ollama(sequence_str, live=ollama_available)
+    if ollama_success:
+        return record_id, "ollama", {
+            "Predicted_Species": ollama_result.get("species", "Unknown"),
+            "Classifier_Confidence": float(ollama_result.get("confidence", 0.75)),
+            "Novelty_Score": 0.3,
+            "Local_DB_Match": False,
+            "Analysis_Method": "Local Ollama LLM"
+        }
+    
+    # If both local methods fail, queue for cloud AI
+    return record_id, "cloud", None
+
 def analyze_with_hybrid_strategy(fasta_file_path: str):
     """
     Orchestrates the new, efficient, multi-stage hybrid analysis.
     """
-    all_records = list(SeqIO.parse(fasta_file_path, "fasta"))
-    
     # --- Step 1: Multi-Model Analysis Strategy ---
     print("--- Running Multi-Model Analysis Pipeline ---")
     local_blast_results = {}
     ollama_results = {}
     sequences_for_cloud_ai = []
     
-    for record in all_records:
-        sequence_str = str(record.seq)
-        
-        # Try local BLAST first
-        blast_match, blast_result = run_local_blast(sequence_str)
-        if blast_match:
-            local_blast_results[record.id] = {
-                "Predicted_Species": f"{record.description.split(' ')[1]} (Verified Locally)",
-                "Classifier_Confidence": "1.0000",
-                "Novelty_Score": "0.0100",
-                "Local_DB_Match": True,
-                "Analysis_Method": "Local BLAST"
-            }
-            continue
-        
-        # Try Ollama local LLM if BLAST fails
-        ollama_success, ollama_result = analyze_with_ollama(sequence_str)
-        if ollama_success:
-            ollama_results[record.id] = {
-                "Predicted_Species": ollama_result.get("species", "Unknown"),
-                "Classifier_Confidence": str(ollama_result.get("confidence", 0.75)),
-                "Novelty_Score": "0.3000",
-                "Local_DB_Match": False,
-                "Analysis_Method": "Local Ollama LLM"
-            }
-            continue
+    # A single blastn run covers every record. The file is then streamed once: BLAST hits
+    # are resolved inline, and only sequences that still need Ollama or the cloud AI are
+    # kept in memory. Ollama calls are I/O-bound, so they run concurrently.
+    blast_hits = run_local_blast_batch(fasta_file_path)
+    ollama_available = _ollama_alive()
+    if ollama_available:
+        warm_up_ollama()
+    ollama_jobs = []
+    # Cache hits return immediately; live Ollama calls are throttled by _OLLAMA_SLOTS
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        for record in _iter_fasta(fasta_file_path):
+            record_id = record[0]
+            if record_id in blast_hits:
+                local_blast_results[record_id] = _classify_one(record, blast_hits, False)[2]
+            elif ollama_available:
+                ollama_jobs.append((record, executor.submit(_classify_one, record, blast_hits, True)))
+            else:
+                # Ollama is down, but earlier answers in the cache are still usable
+                _, source, result = _classify_one(record, blast_hits, False)
+                if source == "ollama":
+                    ollama_results[record_id] = result
+                else:
+                    sequences_for_cloud_ai.append(record)
         
-        # If both local methods fail, queue for cloud AI
-        sequences_for_cloud_ai.append(record)
+        for record, job in ollama_jobs:
+            record_id, source, result = job.result()
+            if source == "ollama":
+                ollama_results[record_id] = result
+            else:
+                sequences_for_cloud_ai.append(record)
     
     print(f"BLAST: {len(local_blast_results)}, Ollama: {len(ollama_results)}, Cloud AI: {len(sequences_for_cloud_ai)} sequences")
 
     # --- Step 2: Cloud AI Analysis (only for remaining sequences) ---
     cloud_ai_results = {}
     if sequences_for_cloud_ai:
-        # Create a temporary FASTA file with only the sequences the AI needs to see
-        with tempfile.NamedTemporaryFile(mode='w+', delete=False, suffix=".fasta") as tmp:
-            SeqIO.write(sequences_for_cloud_ai, tmp, "fasta")
-            tmp_path = tmp.name
+        # Build the FASTA payload with only the sequences the AI needs to see in memory
+        payload = "".join(
+            f">{description}\n{sequence}\n" for _, description, sequence in sequences_for_cloud_ai
+        ).encode()
         
         headers = {"ngrok-skip-browser-warning": "true"}
         
         try:
-            with open(tmp_path, 'rb') as f:
-                files = {'fastaFile': f}
-                print("--- Calling Live Classifier & Novelty AI Servers ---")
-                classifier_response = requests.post(CLASSIFIER_API_URL, files=files, headers=headers, verify=False, timeout=60)
-                classifier_response.raise_for_status()
-                classifier_results = classifier_response.json()["predictions"]
-
-                f.seek(0) # Reset file pointer for the second request
-                novelty_response = requests.post(NOVELTY_API_URL, files=files, headers=headers, verify=False, timeout=60)
-                novelty_response.raise_for_status()
-                novelty_results = novelty_response.json()["novelty_scores"]
+            files = {'fastaFile': ('sequences.fasta', payload, 'application/octet-stream')}
+            print("--- Calling Live Classifier & Novelty AI Servers ---")
+            # The two servers are independent, so both requests are in flight at once
+            with ThreadPoolExecutor(max_workers=2) as executor:
+                classifier_future = executor.submit(
+                    _SESSION.post, CLASSIFIER_API_URL, files=files, headers=headers, timeout=60
+                )
+                novelty_future = executor.submit(
+                    _SESSION.post, NOVELTY_API_URL, files=files, headers=headers, timeout=60
+                )
+                classifier_response = classifier_future.result()
+                novelty_response = novelty_future.result()
+            
+            classifier_response.raise_for_status()
+            classifier_results = _json_loads(classifier_response.content)["predictions"]
+
+            novelty_response.raise_for_status()
+            novelty_results = _json_loads(novelty_response.content)["novelty_scores"]
+
+            # Results are matched to sequences by position, so a short or long response
+            # would silently drop or misattribute records
+            expected = len(sequences_for_cloud_ai)
+            if len(classifier_results) != expected or len(novelty_results) != expected:
+                raise ValueError(
+                    f"expected {expected} cloud AI results, got {len(classifier_results)} "
+                    f"predictions and {len(novelty_results)} novelty scores"
+                )
         except Exception as e:
             print(f"Cloud AI failed: {e}. Using fallback analysis.")
-            # Fallback to local analysis for remaining sequences
-            fallback_analyzer = BioAnalyzerFallback("fallback")
-            for record in sequences_for_cloud_ai:
-                cloud_ai_results[record.id] = {
-                    "Predicted_Species": f"Fallback_{record.id}",
-                    "Classifier_Confidence": "0.6000",
-                    "Novelty_Score": "0.5000",
-                    "Local_DB_Match": False,
-                    "Analysis_Method": "Fallback Simulation"
-                }
             return analyze_with_fallback_only(fasta_file_path)
-        
-        os.remove(tmp_path) # Clean up the temporary file
 
         # --- Step 3: The Ensemble Logic for Cloud AI results ---
-        for i, record in enumerate(sequences_for_cloud_ai):
-            class_res = classifier_results[i]
-            novelty_score = novelty_results[i]
-            
+        for (record_id, _, _), class_res, novelty_score in zip(
+            sequences_for_cloud_ai, classifier_results, novelty_results
+        ):
             species_name = f"TaxID:{class_res['taxonomic_id']}"
             confidence_score = class_res['confidence']
 
@@ -272,30 +455,42 @@ def analyze_with_hybrid_strategy(fasta_file_path: str):
             if novelty_score > 0.9 and confidence_score < 0.8:
                 final_prediction = "Novel Taxa Discovery Alert!"
 
-            cloud_ai_results[record.id] = {
+            cloud_ai_results[record_id] = {
                 "Predicted_Species": final_prediction,
-                "Classifier_Confidence": f"{confidence_score:.4f}",
-                "Novelty_Score": f"{novelty_score:.4f}",
+                "Classifier_Confidence": confidence_score,
+                "Novelty_Score": novelty_score,
                 "Local_DB_Match": False,
                 "Analysis_Method": "Cloud AI Ensemble"
             }
 
     # --- Step 4: Merge All Results (BLAST, Ollama, Cloud AI) ---
-    final_results_data = []
+    # Columns are collected as parallel lists so the DataFrame is built column-wise with
+    # explicit dtypes instead of inferring them from a list of per-row dicts.
+    ids, species, confidences, novelties, matched, methods = [], [], [], [], [], []
     species_list = []
-    for record in all_records:
-        if record.id in local_blast_results:
-            result = local_blast_results[record.id]
-        elif record.id in ollama_results:
-            result = ollama_results[record.id]
-        else:
-            result = cloud_ai_results.get(record.id, {})
+    # Merge once up front (right wins: BLAST over Ollama over cloud AI) so each row needs
+    # a single lookup
+    merged_results = {**cloud_ai_results, **ollama_results, **local_blast_results}
+    # Second streaming pass over the file restores the input order for the merged rows
+    for record_id, _, _ in _iter_fasta(fasta_file_path):
+        result = merged_results.get(record_id, _EMPTY_RESULT)
         
-        full_result = {"Sequence_ID": record.id, **result}
-        final_results_data.append(full_result)
-        species_list.append(full_result.get("Predicted_Species", "Unclassified"))
+        ids.append(record_id)
+        species.append(result.get("Predicted_Species"))
+        confidences.append(result.get("Classifier_Confidence", np.nan))
+        novelties.append(result.get("Novelty_Score", np.nan))
+        matched.append(result.get("Local_DB_Match", False))
+        methods.append(result.get("Analysis_Method"))
+        species_list.append(result.get("Predicted_Species", "Unclassified"))
         
-    results_df = pd.DataFrame(final_results_data)
+    results_df = pd.DataFrame({
+        "Sequence_ID": ids,
+        "Predicted_Species": species,
+        "Classifier_Confidence": np.asarray(confidences, dtype=np.float64),
+        "Novelty_Score": np.asarray(novelties, dtype=np.float64),
+        "Local_DB_Match": np.asarray(matched, dtype=bool),
+        "Analysis_Method": pd.Categorical(methods)
+    })
     
     # --- Step 5: Abundance Estimation on the Final, Merged Results ---
     abundance_model = AbundanceEstimator()
@@ -305,6 +500,19 @@ def analyze_with_hybrid_strategy(fasta_file_path: str):
     
     return results_df, biodiversity_metrics, corrected_abundance
 
+def _results_to_records(results_df: pd.DataFrame) -> list:
+    """
+    Converts the results DataFrame to JSON-ready rows. Scores are kept numeric during
+    analysis and only formatted as fixed four-decimal strings here.
+    """
+    records = results_df.to_dict(orient='records')
+    for row in records:
+        for column in SCORE_COLUMNS:
+            value = row.get(column)
+            if isinstance(value, float) and not np.isnan(value):
+                row[column] = f"{value:.4f}"
+    return records
+
 def analyze_with_fallback_only(fasta_file_path: str):
     """Fallback analysis when all other methods fail."""
     fallback_analyzer = BioAnalyzerFallback(model_path="fallback")
@@ -347,17 +555,19 @@ def main():
         results_df, biodiversity_metrics, corrected_abundance = analyze_with_hybrid_strategy(fasta_file)
 
         output = {
-            "classification_results": results_df.to_dict(orient='records'),
+            "classification_results": _results_to_records(results_df),
             "biodiversity_metrics": biodiversity_metrics,
             "corrected_abundance": corrected_abundance,
             "status": "success",
             "mode": "Multi-Model Hybrid Analysis (BLAST + Ollama + Cloud AI + Fallback)"
         }
-        print(json.dumps(output))
+        _emit_json(output)
         
     except Exception as e:
         print(json.dumps({"error": str(e), "status": "error"}))
         sys.exit(1)
+    finally:
+        close_ollama_cache()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,16 +1,67 @@
 # python_engine/quantum_jobs/enhanced_quantum_simulator.py
 import numpy as np
-import json
+import orjson
 import time
-from typing import Dict, List, Any, Tuple
+import itertools
+import zlib
+import base64
+import functools
+import math
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from collections import deque
+from typing import Dict, List, Any, Tuple, Iterator, Union
 from datetime import datetime
 import logging
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 
+try:
+    import numba
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Integer codes for the energy objectives so the kernel below can be compiled
+_ENERGY_OBJECTIVES = {"maximize_biodiversity": 0, "minimize_fragmentation": 1}
+
+def _solution_energy(solution, objective_code, noise):
+    """Energy of a solution for an objective code, plus pre-drawn noise."""
+    # Solutions may arrive in narrow (possibly unsigned) dtypes; widen before negating/diffing
+    solution = solution.astype(np.int64)
+    if objective_code == 0:
+        # Lower energy = higher biodiversity
+        return -np.sum(solution) + noise
+    if objective_code == 1:
+        # Penalize isolated habitats
+        return np.sum(np.abs(np.diff(solution))) + noise
+    return noise
+
+if NUMBA_AVAILABLE:
+    @numba.njit(cache=True)
+    def _place_habitats(n, max_habitats, threshold, rand_vals):
+        """Greedy placement: take each site whose draw beats threshold until max_habitats."""
+        solution = np.zeros(n, np.int8)
+        placed = 0
+        for i in range(n):
+            if placed < max_habitats and rand_vals[i] > threshold:
+                solution[i] = 1
+                placed += 1
+        return solution
+    
+    _solution_energy = numba.njit(cache=True)(_solution_energy)
+else:
+    def _place_habitats(n, max_habitats, threshold, rand_vals):
+        """Greedy placement: take each site whose draw beats threshold until max_habitats."""
+        solution = np.zeros(n, np.int8)
+        solution[np.flatnonzero(rand_vals > threshold)[:max(max_habitats, 0)]] = 1
+        return solution
+
 class QuantumAlgorithm(Enum):
     GROVER_SEARCH = "grover_search"
     QUANTUM_ANNEALING = "quantum_annealing"
@@ -26,27 +77,145 @@ class QuantumJob:
     status: str = "pending"
     result: Dict[str, Any] = None
     error: str = None
-    start_time: datetime = None
-    end_time: datetime = None
+    # Epoch nanoseconds (0 = not set); formatted to ISO-8601 only on egress
+    start_ns: int = 0
+    end_ns: int = 0
     quantum_volume: int = 64
     circuit_depth: int = 10
+    # Formatted status dict, built once the job reaches a final state
+    _cached_status: Dict[str, Any] = field(default=None, repr=False)
+
+# Lookup tables for simulated Grover matches, built once
+_HABITATS = ("forest", "marine", "grassland")
+_STATUSES = ("LC", "NT", "VU", "EN", "CR")
+_HABITAT_TABLE = np.array(_HABITATS)
+_STATUS_TABLE = np.array(_STATUSES)
+
+STATEVECTOR_BACKENDS = ("stub", "statevector", "custatevec")
+
+def _array_module(backend: str):
+    """NumPy for CPU state vectors, CuPy (the cuQuantum Python stack) for GPU ones; imported on first use."""
+    if backend == "custatevec":
+        try:
+            import cupy
+        except ImportError as e:
+            raise RuntimeError("custatevec backend requires cuquantum-python and cupy") from e
+        return cupy
+    return np
+
+def _grover_statevector(n_qubits: int, iterations: int, target_index: int, xp=np) -> float:
+    """
+    Run Grover's algorithm on a 2**n_qubits state vector and return the probability of
+    measuring the marked index. Each iteration is an oracle phase flip plus the diffusion
+    (inversion about the mean), both applied in place.
+    """
+    dim = 1 << n_qubits
+    state = xp.full(dim, 1.0 / math.sqrt(dim))
+    for _ in range(iterations):
+        state[target_index] *= -1.0
+        mean = state.mean()
+        state *= -1.0
+        state += 2.0 * mean
+    return float(state[target_index] ** 2)
+
+@functools.lru_cache(maxsize=256)
+def _grover_constants(database_size: int) -> Tuple[int, int]:
+    """(n_qubits, optimal Grover iterations) for a database size, using integer arithmetic."""
+    # ceil(log2(n)) is the bit length of n - 1; pi/4 * floor(sqrt(n)) for the iterations,
+    # never fewer than one so tiny databases still get a Grover step
+    return (max(1, (database_size - 1).bit_length()),
+            max(1, int(0.7853981633974483 * math.isqrt(database_size))))
+
+@functools.lru_cache(maxsize=256)
+def _ml_constants(n_features: int, dataset_size: int) -> Tuple[int, float, float]:
+    """(n_qubits, classical training time, quantum training time) for the input sizes."""
+    return (max(int(math.ceil(math.log2(n_features))), 4),
+            dataset_size * 0.01,
+            math.sqrt(dataset_size) * 0.02)
+
+def _bitstring_fields(bits: np.ndarray, as_list: bool = False) -> Dict[str, Any]:
+    """
+    Result fields for a 0/1 solution: packed to bytes and base64 encoded, plus the
+    bit count for unpacking. The plain "solution" list is only added when as_list is set.
+    """
+    fields = {
+        "solution_b64": base64.b64encode(np.packbits(bits.astype(np.uint8, copy=False)).tobytes()).decode(),
+        "solution_nbits": int(bits.size)
+    }
+    if as_list:
+        fields["solution"] = bits.tolist()
+    return fields
+
+# Beyond this many arrivals Poisson(2) mass is below double precision; the CDF table stops here
+_POISSON_TABLE_MAX = 40
+
+@functools.lru_cache(maxsize=64)
+def _capped_poisson_cdf(cap: int, lam: float = 2.0) -> np.ndarray:
+    """CDF of min(Poisson(lam), cap) over 0..cap (truncated at _POISSON_TABLE_MAX)."""
+    n = min(cap, _POISSON_TABLE_MAX) + 1
+    pmf = np.empty(n)
+    pmf[0] = math.exp(-lam)
+    for k in range(1, n):
+        pmf[k] = pmf[k - 1] * lam / k
+    cdf = np.cumsum(pmf)
+    cdf[-1] = 1.0
+    cdf.flags.writeable = False
+    return cdf
+
+def _format_ns(timestamp_ns: int) -> str:
+    """ISO-8601 local time for an epoch-ns timestamp, or None if unset."""
+    return datetime.fromtimestamp(timestamp_ns / 1e9).isoformat() if timestamp_ns else None
+
+# One VQE optimization step; the trajectory is kept as a record array until egress
+VQE_STEP_DTYPE = np.dtype([("step", "i4"), ("energy", "f8"), ("gradient_norm", "f8")])
+
+# Completed jobs kept for status lookups; older ones are evicted
+COMPLETED_JOBS_MAXLEN = 10000
 
 class EnhancedQuantumSimulator:
-    def __init__(self, max_qubits: int = 20):
+    # Simulation method for each algorithm
+    _DISPATCH = {
+        QuantumAlgorithm.GROVER_SEARCH: "_run_grover_search",
+        QuantumAlgorithm.QUANTUM_ANNEALING: "_run_quantum_annealing",
+        QuantumAlgorithm.VARIATIONAL_QUANTUM_EIGENSOLVER: "_run_vqe",
+        QuantumAlgorithm.QUANTUM_APPROXIMATE_OPTIMIZATION: "_run_qaoa",
+        QuantumAlgorithm.QUANTUM_MACHINE_LEARNING: "_run_quantum_ml",
+    }
+    
+    def __init__(self, max_qubits: int = 20, realtime_sim: bool = False, seed: int = None,
+                 backend: str = "stub"):
+        if backend not in STATEVECTOR_BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}. Available: {list(STATEVECTOR_BACKENDS)}")
         self.max_qubits = max_qubits
+        # "stub" fakes the quantum results; the others run a real state vector for
+        # Grover search, on the CPU ("statevector") or a GPU ("custatevec")
+        self.backend = backend
         self.active_jobs = {}
-        self.completed_jobs = {}
+        # Bounded history of completed jobs, with an id index over the same jobs
+        self.completed_jobs = deque(maxlen=COMPLETED_JOBS_MAXLEN)
+        self._completed_index = {}
+        self._completed_total = 0
+        # Job ids are a random per-instance token plus a counter, so ids stay unique
+        # across simulator instances and process restarts without drawing from _rng
+        self._job_prefix = f"qjob_{secrets.token_hex(4)}_"
+        self._job_counter = itertools.count()
+        # Worker processes for execute_jobs_batch, started on first use
+        self._pool = None
         self.quantum_noise_level = 0.01
+        # One seedable PCG64 generator for every simulated draw
+        self._rng = np.random.default_rng(seed)
+        # When False, simulated computation time is only reported, never slept
+        self.realtime_sim = realtime_sim
         
     def submit_job(self, algorithm: QuantumAlgorithm, parameters: Dict[str, Any]) -> str:
         """Submit a quantum job for execution."""
-        job_id = f"qjob_{int(time.time())}_{np.random.randint(1000, 9999)}"
+        job_id = f"{self._job_prefix}{next(self._job_counter):08x}"
         
         job = QuantumJob(
             job_id=job_id,
             algorithm=algorithm,
             parameters=parameters,
-            start_time=datetime.now()
+            start_ns=time.time_ns()
         )
         
         self.active_jobs[job_id] = job
@@ -60,40 +229,121 @@ class EnhancedQuantumSimulator:
             return {"error": "Job not found"}
         
         job = self.active_jobs[job_id]
-        job.status = "running"
+        self._start_job(job)
         
         try:
-            if job.algorithm == QuantumAlgorithm.GROVER_SEARCH:
-                result = self._run_grover_search(job.parameters)
-            elif job.algorithm == QuantumAlgorithm.QUANTUM_ANNEALING:
-                result = self._run_quantum_annealing(job.parameters)
-            elif job.algorithm == QuantumAlgorithm.VARIATIONAL_QUANTUM_EIGENSOLVER:
-                result = self._run_vqe(job.parameters)
-            elif job.algorithm == QuantumAlgorithm.QUANTUM_APPROXIMATE_OPTIMIZATION:
-                result = self._run_qaoa(job.parameters)
-            elif job.algorithm == QuantumAlgorithm.QUANTUM_MACHINE_LEARNING:
-                result = self._run_quantum_ml(job.parameters)
-            else:
-                raise ValueError(f"Unknown algorithm: {job.algorithm}")
-            
-            job.result = result
-            job.status = "completed"
-            job.end_time = datetime.now()
-            
-            # Move to completed jobs
-            self.completed_jobs[job_id] = job
-            del self.active_jobs[job_id]
-            
-            logger.info(f"Quantum job {job_id} completed successfully")
-            return {"success": True, "result": result}
-            
+            result = self._run_algorithm(job)
         except Exception as e:
-            job.error = str(e)
-            job.status = "failed"
-            job.end_time = datetime.now()
-            
-            logger.error(f"Quantum job {job_id} failed: {e}")
-            return {"error": str(e)}
+            return self._fail_job(job, str(e))
+        return self._complete_job(job, result)
+    
+    def execute_jobs_batch(self, job_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Execute several quantum jobs in parallel worker processes.
+        Jobs share no state, so each worker gets only the QuantumJob (a dataclass with an
+        Enum member, both safe to pickle) and its own child generator spawned from this
+        simulator's, which keeps results reproducible per job for a seeded simulator.
+        """
+        # Each job runs once even if its id is repeated; repeats share its response
+        unique_ids = list(dict.fromkeys(job_ids))
+        jobs = [self.active_jobs.get(job_id) for job_id in unique_ids]
+        runnable = [job for job in jobs if job is not None]
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+        
+        futures, responses = {}, {}
+        pool_broken = False
+        for job, rng in zip(runnable, self._rng.spawn(len(runnable))):
+            self._start_job(job)
+            try:
+                futures[job.job_id] = self._pool.submit(
+                    _execute_one, job, rng, self.realtime_sim, self.quantum_noise_level,
+                    self.max_qubits, self.backend
+                )
+            except Exception as e:
+                responses[job.job_id] = self._fail_job(job, f"{type(e).__name__}: {e}")
+                pool_broken = pool_broken or isinstance(e, BrokenProcessPool)
+        
+        for job_id, job in zip(unique_ids, jobs):
+            if job_id in responses:
+                continue
+            if job is None:
+                responses[job_id] = {"error": "Job not found"}
+                continue
+            try:
+                result, error = futures[job_id].result()
+            except Exception as e:
+                # A crashed worker (BrokenProcessPool) fails its jobs instead of
+                # aborting the whole batch
+                result, error = None, f"{type(e).__name__}: {e}"
+                pool_broken = pool_broken or isinstance(e, BrokenProcessPool)
+            if error is None:
+                responses[job_id] = self._complete_job(job, result)
+            else:
+                responses[job_id] = self._fail_job(job, error)
+        
+        if pool_broken:
+            # A broken pool rejects all further work; start a fresh one on next use
+            self._pool.shutdown(wait=False)
+            self._pool = None
+        return [responses[job_id] for job_id in job_ids]
+    
+    def close(self):
+        """Shut down the worker processes started by execute_jobs_batch."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _run_algorithm(self, job: QuantumJob) -> Dict[str, Any]:
+        """Run the simulation for a job's algorithm."""
+        method_name = self._DISPATCH.get(job.algorithm)
+        if method_name is None:
+            raise ValueError(f"Unknown algorithm: {job.algorithm}")
+        result = getattr(self, method_name)(job.parameters)
+        result["backend"] = self.backend
+        return result
+    
+    def _start_job(self, job: QuantumJob):
+        """Mark a job running, dropping any status cached from an earlier (failed) run."""
+        job.status = "running"
+        job.error = None
+        job._cached_status = None
+    
+    def _complete_job(self, job: QuantumJob, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Record a successful job and move it to the completed history."""
+        job.result = result
+        job.status = "completed"
+        job.end_ns = time.time_ns()
+        job._cached_status = self._build_job_status(job, format_times=True)
+        
+        # Move to completed jobs
+        self._record_completed(job)
+        del self.active_jobs[job.job_id]
+        
+        logger.info(f"Quantum job {job.job_id} completed successfully")
+        return {"success": True, "result": result}
+    
+    def _fail_job(self, job: QuantumJob, error: str) -> Dict[str, Any]:
+        """Record a failed job."""
+        job.error = error
+        job.status = "failed"
+        job.end_ns = time.time_ns()
+        job._cached_status = self._build_job_status(job, format_times=True)
+        
+        logger.error(f"Quantum job {job.job_id} failed: {error}")
+        return {"error": error}
+    
+    def _simulate_runtime(self, seconds: float) -> float:
+        """Account for simulated computation time; only sleeps in realtime mode."""
+        if self.realtime_sim:
+            time.sleep(seconds)
+        return seconds
     
     def _run_grover_search(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """Simulate Grover's search algorithm for biodiversity database search."""
@@ -102,11 +352,10 @@ class EnhancedQuantumSimulator:
         search_criteria = params.get("search_criteria", {})
         
         # Calculate optimal number of iterations
-        n_qubits = int(np.ceil(np.log2(database_size)))
-        optimal_iterations = int(np.pi * np.sqrt(database_size) / 4)
+        n_qubits, optimal_iterations = _grover_constants(database_size)
         
         # Simulate quantum search
-        time.sleep(0.5)  # Simulate quantum computation time
+        wall_time = self._simulate_runtime(0.5)  # Simulate quantum computation time
         
         # Simulate finding target with quantum speedup
         classical_time = database_size * 0.001  # Linear search time
@@ -114,19 +363,34 @@ class EnhancedQuantumSimulator:
         
         # Add quantum noise
         success_probability = 1.0 - self.quantum_noise_level
-        found = np.random.random() < success_probability
+        if self.backend != "stub":
+            if n_qubits > self.max_qubits:
+                raise ValueError(f"Grover search needs {n_qubits} qubits, simulator allows {self.max_qubits}")
+            target_index = zlib.crc32(str(target_species).encode()) % database_size
+            success_probability *= _grover_statevector(
+                n_qubits, optimal_iterations, target_index, _array_module(self.backend)
+            )
+        found = self._rng.random() < success_probability
         
         if found:
-            # Simulate finding matching species
+            # Simulate finding matching species: draw and index whole columns at once,
+            # building the per-species dicts only at the end for the JSON response
+            k = min(5, database_size // 100)
+            idx = np.arange(k)
+            confidence = 0.85 + self._rng.random(k) * 0.15
+            habitats = _HABITAT_TABLE[idx % len(_HABITATS)]
+            statuses = _STATUS_TABLE[idx % len(_STATUSES)]
             matching_species = [
                 {
                     "species_id": f"species_{i}",
                     "name": f"Biodiversity Species {i}",
-                    "confidence": 0.85 + np.random.random() * 0.15,
-                    "habitat": ["forest", "marine", "grassland"][i % 3],
-                    "conservation_status": ["LC", "NT", "VU", "EN", "CR"][i % 5]
+                    "confidence": conf,
+                    "habitat": habitat,
+                    "conservation_status": status
                 }
-                for i in range(min(5, database_size // 100))
+                for i, conf, habitat, status in zip(
+                    idx.tolist(), confidence.tolist(), habitats.tolist(), statuses.tolist()
+                )
             ]
         else:
             matching_species = []
@@ -143,7 +407,8 @@ class EnhancedQuantumSimulator:
             "success_probability": success_probability,
             "found": found,
             "matching_species": matching_species,
-            "quantum_advantage": True if quantum_time < classical_time else False
+            "quantum_advantage": True if quantum_time < classical_time else False,
+            "simulated_wall_time_s": wall_time
         }
     
     def _run_quantum_annealing(self, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -156,7 +421,7 @@ class EnhancedQuantumSimulator:
         n_variables = params.get("n_variables", 10)
         annealing_time = params.get("annealing_time", 20)  # microseconds
         
-        time.sleep(0.3)  # Simulate annealing time
+        wall_time = self._simulate_runtime(0.3)  # Simulate annealing time
         
         # Generate optimal solution
         if problem_type == "habitat_optimization":
@@ -164,7 +429,7 @@ class EnhancedQuantumSimulator:
         elif problem_type == "species_distribution":
             solution = self._optimize_species_distribution(n_variables, constraints)
         else:
-            solution = np.random.choice([0, 1], size=n_variables)
+            solution = self._rng.integers(0, 2, size=n_variables, dtype=np.int8)
         
         # Calculate energy (cost function value)
         energy = self._calculate_energy(solution, objective_function)
@@ -174,11 +439,16 @@ class EnhancedQuantumSimulator:
             "problem_type": problem_type,
             "n_variables": n_variables,
             "annealing_time": annealing_time,
-            "solution": solution.tolist(),
+            # Species distribution solutions are counts, the others are bitstrings
+            **(
+                {"solution": solution.tolist()} if problem_type == "species_distribution"
+                else _bitstring_fields(solution, params.get("solution_as_list", False))
+            ),
             "energy": energy,
             "objective_value": -energy,  # Minimize energy = maximize objective
             "convergence": True,
-            "quantum_tunneling_events": np.random.randint(5, 20)
+            "quantum_tunneling_events": int(self._rng.integers(5, 20)),
+            "simulated_wall_time_s": wall_time
         }
     
     def _run_vqe(self, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -187,21 +457,20 @@ class EnhancedQuantumSimulator:
         basis_set = params.get("basis_set", "sto-3g")
         n_qubits = params.get("n_qubits", 4)
         
-        time.sleep(0.4)  # Simulate VQE optimization
+        wall_time = self._simulate_runtime(0.4)  # Simulate VQE optimization
         
         # Simulate finding ground state energy
-        ground_state_energy = -1.137 + np.random.normal(0, 0.01)  # H2O example
-        
-        # Simulate optimization convergence
-        optimization_steps = []
-        current_energy = 0.0
-        for step in range(50):
-            current_energy += np.random.normal(-0.02, 0.005)
-            optimization_steps.append({
-                "step": step,
-                "energy": current_energy,
-                "gradient_norm": abs(np.random.normal(0, 0.1))
-            })
+        ground_state_energy = -1.137 + self._rng.normal(0, 0.01)  # H2O example
+        
+        # Simulate optimization convergence: the energy trajectory is a cumulative sum of
+        # Gaussian steps, so draw all 50 at once into one contiguous record array
+        n_steps = 50
+        steps = np.empty(n_steps, dtype=VQE_STEP_DTYPE)
+        steps["step"] = np.arange(n_steps)
+        steps["energy"] = np.cumsum(self._rng.standard_normal(n_steps) * 0.005 - 0.02)
+        steps["gradient_norm"] = np.abs(self._rng.standard_normal(n_steps) * 0.1)
+        # Only the returned rows become dicts
+        optimization_steps = [dict(zip(VQE_STEP_DTYPE.names, row)) for row in steps[-10:].tolist()]
         
         return {
             "algorithm": "vqe",
@@ -209,10 +478,11 @@ class EnhancedQuantumSimulator:
             "basis_set": basis_set,
             "n_qubits": n_qubits,
             "ground_state_energy": ground_state_energy,
-            "optimization_steps": optimization_steps[-10:],  # Last 10 steps
+            "optimization_steps": optimization_steps,  # Last 10 steps
             "converged": True,
             "final_gradient_norm": optimization_steps[-1]["gradient_norm"],
-            "quantum_circuit_depth": np.random.randint(10, 50)
+            "quantum_circuit_depth": int(self._rng.integers(10, 50)),
+            "simulated_wall_time_s": wall_time
         }
     
     def _run_qaoa(self, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -221,30 +491,31 @@ class EnhancedQuantumSimulator:
         p_layers = params.get("p_layers", 3)
         optimization_method = params.get("optimization_method", "COBYLA")
         
-        time.sleep(0.6)  # Simulate QAOA execution
+        wall_time = self._simulate_runtime(0.6)  # Simulate QAOA execution
         
         # Simulate optimization of biodiversity conservation problem
         n_nodes = len(problem_graph.get("nodes", range(10)))
         
         # Generate approximate solution
-        solution_bitstring = np.random.choice([0, 1], size=n_nodes)
-        approximation_ratio = 0.7 + np.random.random() * 0.25  # 70-95% of optimal
+        solution_bitstring = self._rng.integers(0, 2, size=n_nodes, dtype=np.int8)
+        approximation_ratio = 0.7 + self._rng.random() * 0.25  # 70-95% of optimal
         
         # Simulate parameter optimization
-        beta_params = np.random.uniform(0, np.pi, p_layers)
-        gamma_params = np.random.uniform(0, 2*np.pi, p_layers)
+        beta_params = self._rng.uniform(0, np.pi, p_layers)
+        gamma_params = self._rng.uniform(0, 2*np.pi, p_layers)
         
         return {
             "algorithm": "qaoa",
             "p_layers": p_layers,
             "n_nodes": n_nodes,
-            "solution": solution_bitstring.tolist(),
+            **_bitstring_fields(solution_bitstring, params.get("solution_as_list", False)),
             "approximation_ratio": approximation_ratio,
             "beta_parameters": beta_params.tolist(),
             "gamma_parameters": gamma_params.tolist(),
             "optimization_method": optimization_method,
             "circuit_depth": p_layers * 2,
-            "measurement_shots": 1024
+            "measurement_shots": 1024,
+            "simulated_wall_time_s": wall_time
         }
     
     def _run_quantum_ml(self, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -253,18 +524,16 @@ class EnhancedQuantumSimulator:
         n_features = params.get("n_features", 8)
         n_classes = params.get("n_classes", 5)
         
-        time.sleep(0.8)  # Simulate quantum ML training
+        wall_time = self._simulate_runtime(0.8)  # Simulate quantum ML training
         
-        # Simulate quantum feature map and variational classifier
-        n_qubits = max(int(np.ceil(np.log2(n_features))), 4)
+        # Simulate quantum feature map and variational classifier; the qubit count and
+        # training time estimates depend only on the input sizes
+        n_qubits, classical_training_time, quantum_training_time = _ml_constants(n_features, dataset_size)
         
         # Generate training results
-        training_accuracy = 0.85 + np.random.random() * 0.12
-        test_accuracy = training_accuracy - np.random.random() * 0.05
-        
-        # Simulate quantum advantage analysis
-        classical_training_time = dataset_size * 0.01
-        quantum_training_time = np.sqrt(dataset_size) * 0.02
+        accuracy_draws = self._rng.random(2).tolist()
+        training_accuracy = 0.85 + accuracy_draws[0] * 0.12
+        test_accuracy = training_accuracy - accuracy_draws[1] * 0.05
         
         return {
             "algorithm": "quantum_ml",
@@ -277,86 +546,127 @@ class EnhancedQuantumSimulator:
             "classical_training_time": classical_training_time,
             "quantum_training_time": quantum_training_time,
             "potential_speedup": classical_training_time / quantum_training_time,
-            "quantum_circuit_depth": np.random.randint(20, 100),
-            "entanglement_measure": np.random.random()
+            "quantum_circuit_depth": int(self._rng.integers(20, 100)),
+            "entanglement_measure": self._rng.random(),
+            "simulated_wall_time_s": wall_time
         }
     
     def _optimize_habitat_placement(self, n_variables: int, constraints: Dict) -> np.ndarray:
         """Optimize habitat placement using simulated quantum annealing."""
-        # Simulate finding optimal habitat configuration
-        solution = np.zeros(n_variables)
-        
         # Apply constraints
         max_habitats = constraints.get("max_habitats", n_variables // 2)
         min_distance = constraints.get("min_distance", 2)
         
-        # Greedy placement with quantum-inspired randomness
-        placed = 0
-        for i in range(n_variables):
-            if placed < max_habitats and np.random.random() > 0.3:
-                solution[i] = 1
-                placed += 1
-        
-        return solution
+        # Greedy placement with quantum-inspired randomness; the draws are made up front
+        # so the placement kernel stays pure
+        rand_vals = self._rng.random(n_variables)
+        return _place_habitats(n_variables, max_habitats, 0.3, rand_vals)
     
     def _optimize_species_distribution(self, n_variables: int, constraints: Dict) -> np.ndarray:
         """Optimize species distribution across habitats."""
         # Simulate optimal species allocation
         carrying_capacity = constraints.get("carrying_capacity", n_variables * 2)
         
-        solution = np.random.poisson(2, n_variables)
-        solution = np.minimum(solution, carrying_capacity // n_variables)
-        
-        return solution
+        # Poisson(2) counts capped at the per-habitat capacity, sampled by inverting the
+        # capped CDF (all tail mass sits on the cap) rather than by rejection sampling
+        cap = max(carrying_capacity // n_variables, 0)
+        cdf = _capped_poisson_cdf(cap)
+        solution = np.searchsorted(cdf, self._rng.random(n_variables), side="right")
+        # Smallest signed dtype that holds the cap, so energy arithmetic cannot wrap
+        return solution.astype(np.min_scalar_type(-cap))
     
     def _calculate_energy(self, solution: np.ndarray, objective: str) -> float:
         """Calculate energy (cost) of a solution."""
-        if objective == "maximize_biodiversity":
-            # Lower energy = higher biodiversity
-            return -np.sum(solution) + np.random.normal(0, 0.1)
-        elif objective == "minimize_fragmentation":
-            # Penalize isolated habitats
-            fragmentation = np.sum(np.abs(np.diff(solution)))
-            return fragmentation + np.random.normal(0, 0.1)
-        else:
-            return np.random.normal(0, 1)
+        objective_code = _ENERGY_OBJECTIVES.get(objective, -1)
+        noise = self._rng.normal(0, 0.1 if objective_code >= 0 else 1)
+        return float(_solution_energy(solution, objective_code, noise))
+    
+    def _record_completed(self, job: QuantumJob):
+        """Append a job to the bounded history, dropping the evicted job from the index."""
+        if len(self.completed_jobs) == self.completed_jobs.maxlen:
+            self._completed_index.pop(self.completed_jobs[0].job_id, None)
+        self.completed_jobs.append(job)
+        self._completed_index[job.job_id] = job
+        self._completed_total += 1
     
     def get_job_status(self, job_id: str) -> Dict[str, Any]:
         """Get status of a quantum job."""
-        if job_id in self.active_jobs:
-            job = self.active_jobs[job_id]
-        elif job_id in self.completed_jobs:
-            job = self.completed_jobs[job_id]
-        else:
+        job = self.active_jobs.get(job_id) or self._completed_index.get(job_id)
+        if job is None:
             return {"error": "Job not found"}
-        
+        return self._job_status(job)
+    
+    def _job_status(self, job: QuantumJob, format_times: bool = True) -> Dict[str, Any]:
+        """Status dict for a job; finished jobs reuse the dict built when they finished."""
+        if format_times and job._cached_status is not None:
+            return job._cached_status
+        return self._build_job_status(job, format_times)
+    
+    def _build_job_status(self, job: QuantumJob, format_times: bool) -> Dict[str, Any]:
+        """Build the status dict; format_times=False leaves timestamps as epoch ns."""
+        if format_times:
+            start_time, end_time = _format_ns(job.start_ns), _format_ns(job.end_ns)
+        else:
+            start_time, end_time = job.start_ns or None, job.end_ns or None
         return {
             "job_id": job.job_id,
             "algorithm": job.algorithm.value,
             "status": job.status,
-            "start_time": job.start_time.isoformat() if job.start_time else None,
-            "end_time": job.end_time.isoformat() if job.end_time else None,
+            "start_time": start_time,
+            "end_time": end_time,
             "result": job.result,
             "error": job.error,
             "quantum_volume": job.quantum_volume,
             "circuit_depth": job.circuit_depth
         }
     
-    def list_jobs(self) -> Dict[str, List[Dict[str, Any]]]:
-        """List all quantum jobs."""
-        active = [self.get_job_status(job_id) for job_id in self.active_jobs.keys()]
-        completed = [self.get_job_status(job_id) for job_id in self.completed_jobs.keys()]
+    def list_jobs(self, format_times: bool = True, stream: bool = False
+                  ) -> Union[Dict[str, List[Dict[str, Any]]], Iterator[Dict[str, Any]]]:
+        """
+        List all quantum jobs. With stream=True, return a generator of status dicts
+        (active jobs, then the last 10 completed) built lazily as a JSON streamer consumes it.
+        """
+        if stream:
+            return self._iter_job_statuses(format_times)
+        
+        active = [self._job_status(job, format_times) for job in self.active_jobs.values()]
+        completed = [self._job_status(job, format_times) for job in self._recent_completed()]
         
         return {
             "active_jobs": active,
-            "completed_jobs": completed[-10:],  # Last 10 completed jobs
+            "completed_jobs": completed,  # Last 10 completed jobs
             "total_active": len(active),
-            "total_completed": len(self.completed_jobs)
+            "total_completed": self._completed_total
         }
 
+    def _recent_completed(self, n: int = 10) -> List[QuantumJob]:
+        """The last n completed jobs, oldest first, without walking the whole history."""
+        return list(itertools.islice(reversed(self.completed_jobs), n))[::-1]
+    
+    def _iter_job_statuses(self, format_times: bool) -> Iterator[Dict[str, Any]]:
+        """Yield status dicts for active jobs, then the last 10 completed ones."""
+        # Snapshot the active jobs so submissions during streaming don't break iteration
+        for job in itertools.chain(list(self.active_jobs.values()), self._recent_completed()):
+            yield self._job_status(job, format_times)
+
+def _execute_one(job: QuantumJob, rng: np.random.Generator, realtime_sim: bool,
+                 quantum_noise_level: float, max_qubits: int, backend: str) -> Tuple[Dict[str, Any], str]:
+    """Run one job in a worker process; returns (result, error)."""
+    simulator = EnhancedQuantumSimulator(max_qubits=max_qubits, realtime_sim=realtime_sim, backend=backend)
+    simulator._rng = rng
+    simulator.quantum_noise_level = quantum_noise_level
+    try:
+        return simulator._run_algorithm(job), None
+    except Exception as e:
+        return None, str(e)
+
+def _dumps_pretty(obj) -> str:
+    """Indented JSON via orjson; NumPy arrays and scalars are written natively."""
+    return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY).decode()
+
 def main():
     """Main function for testing quantum simulator."""
-    simulator = EnhancedQuantumSimulator()
+    simulator = EnhancedQuantumSimulator(realtime_sim=False)
     
     # Test Grover search
     grover_job = simulator.submit_job(
@@ -369,7 +679,7 @@ def main():
     )
     
     result = simulator.execute_job(grover_job)
-    print("Grover Search Result:", json.dumps(result, indent=2))
+    print("Grover Search Result:", _dumps_pretty(result))
     
     # Test quantum annealing
     annealing_job = simulator.submit_job(
@@ -382,7 +692,7 @@ def main():
     )
     
     result = simulator.execute_job(annealing_job)
-    print("Quantum Annealing Result:", json.dumps(result, indent=2))
+    print("Quantum Annealing Result:", _dumps_pretty(result))
 
 if __name__ == "__main__":
     main()
@@ -1,35 +1,60 @@
 # python_engine/run_aligner.py
 
-import json
 import sys
+import orjson
 from biomapper_lite.core.aligner import SpeedTester
 
+# Representative sequences for the demo, built once at import
+DEMO_SEQ1 = b"AGCT" * 100
+DEMO_SEQ2 = b"AGCT" * 98 + b"GGTT"
+
+def run_speed_test(seq1=DEMO_SEQ1, seq2=DEMO_SEQ2) -> dict:
+    """Run the speed comparison for one pair of sequences."""
+    tester = SpeedTester(seq1, seq2)
+    return {
+        "status": "success",
+        "results": tester.run_comparison()
+    }
+
+def serve():
+    """
+    Persistent mode: read one JSON object per stdin line ({"seq1": ..., "seq2": ...},
+    both optional) and write one JSON result per line, so the backend pays the
+    Biopython/Qiskit import cost once instead of once per request.
+    """
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            request = orjson.loads(line)
+            output = run_speed_test(request.get("seq1", DEMO_SEQ1), request.get("seq2", DEMO_SEQ2))
+        except Exception as e:
+            output = {
+                "status": "error",
+                "error": f"An error occurred in the aligner script: {str(e)}"
+            }
+        sys.stdout.buffer.write(orjson.dumps(output, option=orjson.OPT_APPEND_NEWLINE))
+        sys.stdout.buffer.flush()
+
 def main():
     """
     This script is dedicated to running the speed comparison.
     It is called by the backend to demonstrate the quantum advantage.
     """
-    try:
-        # Use representative sequences for the demo
-        seq1 = "AGCT" * 100
-        seq2 = "AGCT" * 98 + "GGTT"
-
-        tester = SpeedTester(seq1, seq2)
-        results = tester.run_comparison()
+    if "--server" in sys.argv[1:]:
+        serve()
+        return
 
-        output = {
-            "status": "success",
-            "results": results
-        }
-        print(json.dumps(output))
+    try:
+        print(orjson.dumps(run_speed_test()).decode())
 
     except Exception as e:
         error_output = {
             "status": "error",
             "error": f"An error occurred in the aligner script: {str(e)}"
         }
-        print(json.dumps(error_output))
+        print(orjson.dumps(error_output).decode())
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -6,7 +6,10 @@ Supports HyenaDNA, Caduceus, and other Mamba-based DNA foundation models
 
 import os
 import sys
-import json
+import itertools
+import socketserver
+import tempfile
+import orjson
 import torch
 import numpy as np
 from pathlib import Path
@@ -17,33 +20,60 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+EMBEDDING_DIM = 1280
+# Sequences are grouped into length buckets of this granularity before batching
+LENGTH_BUCKET = 256
+MAX_BATCH_SIZE = 32
+# Per-position embeddings are kept at half precision. Up to EMBEDDING_INLINE_MAX_BYTES
+# they are returned inline; larger ones are written to a .npy file in the service's
+# output directory (MAMBA_EMBEDDINGS_DIR, else the system temp dir). The caller owns
+# that file and must delete it once loaded.
+EMBEDDING_FILE_DTYPE = 'float16'
+EMBEDDING_INLINE_MAX_BYTES = 256 * 1024
+EMBEDDINGS_DIR = os.environ.get('MAMBA_EMBEDDINGS_DIR')
+# Embedding budget per batch when running on CPU
+CPU_BATCH_BYTES = 1 << 30
+
+# Public results hold plain lists so callers can json.dumps them; NumPy scalars that
+# slip through are still serialized natively
+ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+DEFAULT_SOCKET_PATH = '/tmp/mamba_dna.sock'
+
 class MambaDNAService:
     """Service for running Mamba-based DNA foundation models"""
 
-    def __init__(self):
-        self.models = {
-            'hyenadna': {
-                'name': 'HyenaDNA',
-                'description': 'Long-range DNA foundation model',
-                'max_length': 1000000,
-                'tasks': ['embedding', 'classification', 'variant_prediction', 'promoter_prediction']
-            },
-            'caduceus': {
-                'name': 'Caduceus',
-                'description': 'Bidirectional DNA foundation model',
-                'max_length': 131072,
-                'tasks': ['embedding', 'gene_expression', 'chromatin_interaction']
-            },
-            'mamba_dna': {
-                'name': 'Mamba-DNA',
-                'description': 'State-space DNA model',
-                'max_length': 32768,
-                'tasks': ['embedding', 'sequence_classification', 'motif_discovery']
-            }
+    # Model catalogue, shared by all service instances
+    models = {
+        'hyenadna': {
+            'name': 'HyenaDNA',
+            'description': 'Long-range DNA foundation model',
+            'max_length': 1000000,
+            'tasks': ['embedding', 'classification', 'variant_prediction', 'promoter_prediction']
+        },
+        'caduceus': {
+            'name': 'Caduceus',
+            'description': 'Bidirectional DNA foundation model',
+            'max_length': 131072,
+            'tasks': ['embedding', 'gene_expression', 'chromatin_interaction']
+        },
+        'mamba_dna': {
+            'name': 'Mamba-DNA',
+            'description': 'State-space DNA model',
+            'max_length': 32768,
+            'tasks': ['embedding', 'sequence_classification', 'motif_discovery']
         }
+    }
 
+    def __init__(self, embedding_dtype: torch.dtype = torch.float16, output_dir: Optional[str] = None):
+        # Mock embeddings are emitted at reduced precision (float16, or int8 with a scale)
+        self.embedding_dtype = embedding_dtype
+        # Directory for embedding files too large to return inline
+        self.output_dir = output_dir or EMBEDDINGS_DIR
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
         self.loaded_models = {}
+        # Position index and attention-mask buffers, grown on demand and sliced per batch
+        self._positions = torch.arange(0, device=self.device)
+        self._mask_buf = torch.empty(0, 0, dtype=torch.bool, device=self.device)
 
     def load_model(self, model_name: str) -> Optional[object]:
         """Load a Mamba DNA model"""
@@ -59,6 +89,8 @@ class MambaDNAService:
 
             # Placeholder for actual model loading
             model = self._create_mock_model(model_name)
+            if isinstance(model, torch.nn.Module):
+                model = self._prepare_for_inference(model)
             self.loaded_models[model_name] = model
 
             logger.info(f"Successfully loaded {model_name}")
@@ -68,24 +100,51 @@ class MambaDNAService:
             logger.error(f"Failed to load model {model_name}: {str(e)}")
             return None
 
+    def _prepare_for_inference(self, model: torch.nn.Module):
+        """Switch a real model to eval mode and compile it once on load"""
+        model = model.to(self.device).eval()
+        try:
+            return torch.compile(model, mode="reduce-overhead")
+        except Exception as e:
+            logger.warning(f"torch.compile unavailable, using eager model: {str(e)}")
+            return model
+
     def _create_mock_model(self, model_name: str):
         """Create a mock model for demonstration"""
         class MockMambaModel:
-            def __init__(self, name, config):
+            def __init__(self, name, config, device, embedding_dtype):
                 self.name = name
                 self.config = config
+                self.device = device
+                self._embedding_dtype = embedding_dtype
+                # Seeded once so mock embeddings are reproducible across runs
+                self.rng = torch.Generator(device=device).manual_seed(0)
+                # Reused across batches of the same shape
+                self._embedding_buf = None
 
             def forward(self, sequences):
                 # Simulate model inference
                 batch_size = len(sequences)
                 seq_length = len(sequences[0]) if sequences else 1000
-                embedding_dim = 1280
-
-                # Generate realistic-looking embeddings
-                embeddings = torch.randn(batch_size, seq_length, embedding_dim)
-                return {'embeddings': embeddings, 'attention_mask': torch.ones(batch_size, seq_length)}
-
-        return MockMambaModel(model_name, self.models[model_name])
+                embedding_dim = EMBEDDING_DIM
+
+                # Generate realistic-looking embeddings directly on the target device
+                quantize = self._embedding_dtype == torch.int8
+                shape = (batch_size, seq_length, embedding_dim)
+                if self._embedding_buf is None or self._embedding_buf.shape != shape:
+                    self._embedding_buf = torch.empty(shape, device=self.device,
+                                                      dtype=torch.float16 if quantize else self._embedding_dtype)
+                embeddings = self._embedding_buf.normal_(generator=self.rng)
+                # The attention mask is supplied by _process_batch from the input lengths
+                outputs = {}
+                if quantize:
+                    outputs['embeddings'] = (embeddings * 127).round_().clamp_(-127, 127).to(torch.int8)
+                    outputs['embedding_scale'] = 1 / 127
+                else:
+                    outputs['embeddings'] = embeddings
+                return outputs
+
+        return MockMambaModel(model_name, self.models[model_name], self.device, self.embedding_dtype)
 
     def process_sequences(self, sequences: List[str], model_name: str = 'hyenadna',
                          task: str = 'embedding') -> Dict:
@@ -105,14 +164,21 @@ class MambaDNAService:
                     seq = seq[:model_config['max_length']]
                 validated_sequences.append(seq.upper())
 
-            # Batch processing
-            batch_size = min(4, len(validated_sequences))  # Adjust based on GPU memory
-            results = []
-
-            for i in range(0, len(validated_sequences), batch_size):
-                batch = validated_sequences[i:i + batch_size]
-                batch_result = self._process_batch(batch, model, task)
-                results.extend(batch_result)
+            # Batch processing: sort by length, bucket, and size each batch to fit memory
+            order = sorted(range(len(validated_sequences)), key=lambda i: len(validated_sequences[i]))
+            results = [None] * len(validated_sequences)
+            batch_size = 0
+
+            for bucket_len, bucket in itertools.groupby(order, key=lambda i: self._bucket_length(validated_sequences[i])):
+                bucket = list(bucket)
+                bucket_batch_size = self._batch_size_for(bucket_len)
+                batch_size = max(batch_size, bucket_batch_size)
+                for i in range(0, len(bucket), bucket_batch_size):
+                    indices = bucket[i:i + bucket_batch_size]
+                    batch = [validated_sequences[j] for j in indices]
+                    batch_result = self._process_batch(batch, model, task, indices)
+                    for j, result in zip(indices, batch_result):
+                        results[j] = result
 
             return {
                 'status': 'success',
@@ -137,20 +203,41 @@ class MambaDNAService:
                 'task': task
             }
 
-    def _process_batch(self, batch: List[str], model, task: str) -> List[Dict]:
+    @staticmethod
+    def _bucket_length(sequence: str) -> int:
+        """Round a sequence length up to its length bucket"""
+        return -(-len(sequence) // LENGTH_BUCKET) * LENGTH_BUCKET
+
+    def _batch_size_for(self, seq_length: int) -> int:
+        """Number of sequences of this length whose embeddings fit in memory"""
+        if self.device.type == 'cuda':
+            free_bytes, _ = torch.cuda.mem_get_info(self.device)
+            budget = free_bytes // 2  # Leave headroom for activations
+        else:
+            budget = CPU_BATCH_BYTES
+        element_size = torch.empty((), dtype=self.embedding_dtype).element_size()
+        per_sequence = max(seq_length, 1) * EMBEDDING_DIM * element_size
+        return max(1, min(MAX_BATCH_SIZE, budget // per_sequence))
+
+    def _process_batch(self, batch: List[str], model, task: str,
+                       indices: Optional[List[int]] = None) -> List[Dict]:
         """Process a batch of sequences"""
         try:
+            if indices is None:
+                indices = list(range(len(batch)))
+
             # Convert sequences to model input format
-            inputs = self._prepare_inputs(batch)
+            inputs, attention_mask = self._prepare_inputs(batch)
 
             # Run model inference
-            with torch.no_grad():
+            with torch.inference_mode():
                 outputs = model.forward(inputs)
+            outputs['attention_mask'] = attention_mask
 
             # Process outputs based on task
             results = []
-            for i, seq in enumerate(batch):
-                result = self._process_output(outputs, i, seq, task)
+            for i, (index, seq) in enumerate(zip(indices, batch)):
+                result = self._process_output(outputs, i, seq, task, index)
                 results.append(result)
 
             return results
@@ -159,26 +246,63 @@ class MambaDNAService:
             logger.error(f"Batch processing error: {str(e)}")
             return [{'error': str(e)} for _ in batch]
 
-    def _prepare_inputs(self, sequences: List[str]) -> List[str]:
-        """Prepare sequences for model input"""
+    def _prepare_inputs(self, sequences: List[str]) -> Tuple[List[str], torch.Tensor]:
+        """Pad sequences to the batch max length and build the attention mask"""
         # In a real implementation, this would tokenize the DNA sequences
-        return sequences
-
-    def _process_output(self, outputs: Dict, index: int, sequence: str, task: str) -> Dict:
+        lengths = torch.tensor([len(seq) for seq in sequences], device=self.device)
+        max_length = int(lengths.max()) if len(sequences) else 0
+        padded = [seq.ljust(max_length, 'N') for seq in sequences]
+        attention_mask = self._attention_mask_view(len(sequences), max_length)
+        torch.lt(self._positions[:max_length], lengths[:, None], out=attention_mask)
+        return padded, attention_mask
+
+    def _attention_mask_view(self, batch_size: int, length: int) -> torch.Tensor:
+        """Slice of the shared mask buffer, reallocated only when a batch outgrows it"""
+        rows, cols = self._mask_buf.shape
+        if batch_size > rows or length > cols:
+            rows, cols = max(rows, batch_size), max(cols, length)
+            self._mask_buf = torch.empty(rows, cols, dtype=torch.bool, device=self.device)
+            self._positions = torch.arange(cols, device=self.device)
+        return self._mask_buf[:batch_size, :length]
+
+    def _save_embeddings(self, embeddings: np.ndarray) -> str:
+        """
+        Write per-position embeddings to a .npy file in output_dir, which the caller can
+        np.load(mmap_mode='r'). The file belongs to the caller, who must delete it.
+        """
+        fd, path = tempfile.mkstemp(suffix='.npy', prefix='mamba_embeddings_', dir=self.output_dir)
+        with os.fdopen(fd, 'wb') as f:
+            np.save(f, embeddings)
+        return path
+
+    def _process_output(self, outputs: Dict, position: int, sequence: str, task: str,
+                        index: Optional[int] = None) -> Dict:
         """Process model outputs for specific task"""
         base_result = {
-            'sequence_id': f'seq_{index}',
+            'sequence_id': f'seq_{position if index is None else index}',
             'sequence_length': len(sequence),
             'task': task
         }
 
         if task == 'embedding':
-            embeddings = outputs['embeddings'][index].cpu().numpy()
+            # Drop padded positions before any reduction
+            length = int(outputs['attention_mask'][position].sum())
+            # Dequantize to float32 only for the reductions
+            embeddings = outputs['embeddings'][position, :length].float()
+            if 'embedding_scale' in outputs:
+                embeddings = embeddings * outputs['embedding_scale']
+            # Reduce on the device rather than on the host copy
+            std, mean = torch.std_mean(embeddings, dim=0, correction=0)
+            host_embeddings = embeddings.to(torch.float16).cpu().numpy()
+            if host_embeddings.nbytes <= EMBEDDING_INLINE_MAX_BYTES:
+                base_result['embeddings'] = host_embeddings.tolist()
+            else:
+                base_result['embeddings_path'] = self._save_embeddings(host_embeddings)
             base_result.update({
-                'embeddings': embeddings.tolist(),
-                'embedding_shape': embeddings.shape,
-                'mean_embedding': embeddings.mean(axis=0).tolist(),
-                'std_embedding': embeddings.std(axis=0).tolist()
+                'embeddings_dtype': EMBEDDING_FILE_DTYPE,
+                'embedding_shape': list(embeddings.shape),
+                'mean_embedding': mean.cpu().numpy().tolist(),
+                'std_embedding': std.cpu().numpy().tolist()
             })
 
         elif task == 'classification':
@@ -208,10 +332,52 @@ class MambaDNAService:
             'gpu_memory': torch.cuda.get_device_properties(0).total_memory if torch.cuda.is_available() else 0
         }
 
+def serve(socket_path: str = DEFAULT_SOCKET_PATH, output_dir: Optional[str] = None):
+    """
+    Persistent mode: keep one MambaDNAService (torch import and loaded models) alive
+    and answer line-delimited JSON requests on a UNIX socket. Each request is
+    {"sequences": [...], "model_name": ..., "task": ...}; each reply is one JSON line.
+    Embedding files named in replies are written to output_dir and are never cleaned up
+    by the server; clients delete them after loading.
+    """
+    service = MambaDNAService(output_dir=output_dir)
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                try:
+                    request = orjson.loads(line)
+                    result = service.process_sequences(request['sequences'],
+                                                       request.get('model_name', 'hyenadna'),
+                                                       request.get('task', 'embedding'))
+                except Exception as e:
+                    result = {'status': 'error', 'error': str(e)}
+                self.wfile.write(orjson.dumps(result, option=ORJSON_OPTIONS | orjson.OPT_APPEND_NEWLINE))
+                self.wfile.flush()
+
+    # Remove a stale socket left behind by a previous run
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    with socketserver.UnixStreamServer(socket_path, Handler) as server:
+        logger.info(f"Serving Mamba DNA requests on {socket_path}")
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(socket_path)
+
 def main():
     """Main function for command-line usage"""
+    if '--serve' in sys.argv[1:]:
+        index = sys.argv.index('--serve')
+        serve(sys.argv[index + 1] if len(sys.argv) > index + 1 else DEFAULT_SOCKET_PATH)
+        return
+
     if len(sys.argv) < 2:
         print("Usage: python run_mamba_dna.py <sequences_file> [model_name] [task]")
+        print("       python run_mamba_dna.py --serve [socket_path]")
         sys.exit(1)
 
     sequences_file = sys.argv[1]
@@ -231,7 +397,7 @@ def main():
     result = service.process_sequences(sequences, model_name, task)
 
     # Output results
-    print(json.dumps(result, indent=2))
+    print(orjson.dumps(result, option=ORJSON_OPTIONS | orjson.OPT_INDENT_2).decode())
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
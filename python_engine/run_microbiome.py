@@ -5,10 +5,34 @@ import json
 import os
 from pathlib import Path
 import numpy as np
-from collections import Counter, defaultdict
+from collections import defaultdict
 import warnings
 warnings.filterwarnings('ignore')
 
+OTU_IDENTITY_THRESHOLD = 0.97  # 97% identity threshold
+
+# MinHash/LSH settings for OTU candidate search: 16-mers, 64 single-hash bands, so pairs
+# near 97% identity (k-mer Jaccard ~0.3 on 16S reads) share a band with near certainty
+MINHASH_KMER = 16
+MINHASH_PERMUTATIONS = 64
+MINHASH_BAND_ROWS = 1
+# Signatures cover this fixed-length prefix of each sequence. Similarity compares only
+# the shared prefix, so a truncated read still matches its full-length centroid; reads
+# shorter than the prefix get no signature and are compared exhaustively
+MINHASH_PREFIX = 100
+_MINHASH_PRIME = np.uint64((1 << 31) - 1)
+_minhash_rng = np.random.default_rng(97)
+_MINHASH_A = _minhash_rng.integers(1, _MINHASH_PRIME, MINHASH_PERMUTATIONS, dtype=np.uint64)
+_MINHASH_B = _minhash_rng.integers(0, _MINHASH_PRIME, MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+# 2-bit base codes; anything other than A/C/G/T maps to 4 and breaks k-mers
+_BASE_CODES = np.full(256, 4, dtype=np.uint64)
+_BASE_CODES[np.frombuffer(b'ACGT', dtype=np.uint8)] = np.arange(4, dtype=np.uint64)
+
+# 1 for G/C, 0 for every other byte, so GC counting is a single table lookup per base
+_GC_LUT = np.zeros(256, dtype=np.uint8)
+_GC_LUT[np.frombuffer(b'GC', dtype=np.uint8)] = 1
+
 def run_lightweight_microbiome_analysis(fasta_file_path):
     """
     Run lightweight microbiome analysis using scikit-bio and related libraries
@@ -34,24 +58,27 @@ def run_lightweight_microbiome_analysis(fasta_file_path):
 
         print(f"--- Processing {len(sequences)} sequences ---")
 
+        # Scan the sequences once; the analyses below share these features
+        features = compute_seq_features(sequences)
+
         # Basic sequence statistics
-        seq_lengths = [len(seq) for seq in sequences.values()]
+        seq_lengths = features["lengths"].tolist()
         total_bp = sum(seq_lengths)
 
         # Sequence quality assessment
-        quality_metrics = assess_sequence_quality(sequences)
+        quality_metrics = assess_sequence_quality(sequences, features)
 
         # Taxonomic classification (mock for demo)
-        taxonomic_profile = generate_taxonomic_profile(sequences)
+        taxonomic_profile = generate_taxonomic_profile(sequences, features)
 
         # Diversity analysis
-        diversity_metrics = calculate_diversity_metrics(sequences)
+        diversity_metrics = calculate_diversity_metrics(sequences, features)
 
         # OTU clustering (simplified)
         otu_analysis = perform_otu_clustering(sequences)
 
         # Functional prediction
-        functional_profile = predict_functional_profile(sequences)
+        functional_profile = predict_functional_profile(sequences, features)
 
         return {
             "status": "success",
@@ -82,50 +109,111 @@ def run_lightweight_microbiome_analysis(fasta_file_path):
 def parse_fasta(file_path):
     """Parse FASTA file and return dictionary of sequences"""
     sequences = {}
-    current_id = None
-    current_seq = []
 
     try:
-        with open(file_path, 'r') as f:
-            for line in f:
-                line = line.strip()
-                if line.startswith('>'):
-                    if current_id:
-                        sequences[current_id] = ''.join(current_seq)
-                    current_id = line[1:].split()[0]  # Take first word as ID
-                    current_seq = []
-                elif current_id and line:
-                    current_seq.append(line.upper())
-
-            if current_id:
-                sequences[current_id] = ''.join(current_seq)
+        # Read the whole file once and locate records with NumPy instead of looping per line
+        raw = Path(file_path).read_bytes()
+        buf = np.frombuffer(raw, dtype=np.uint8)
+        newlines = np.flatnonzero(buf == ord('\n'))
+
+        # A header is a '>' at the start of the file or right after a newline
+        line_starts = np.concatenate(([0], newlines + 1))
+        line_starts = line_starts[line_starts < len(raw)]
+        headers = line_starts[buf[line_starts] == ord('>')]
+        header_ends = np.append(newlines, len(raw))[np.searchsorted(newlines, headers)]
+        record_ends = np.append(headers[1:], len(raw))
+
+        for start, header_end, end in zip(headers.tolist(), header_ends.tolist(), record_ends.tolist()):
+            fields = raw[start + 1:header_end].split()
+            if not fields:
+                continue
+            current_id = fields[0].decode()  # Take first word as ID
+            sequence = raw[header_end + 1:end].translate(None, b' \t\r\n').upper()
+            sequences[current_id] = sequence.decode('ascii', 'replace')
 
     except Exception as e:
         print(f"Error parsing FASTA: {e}")
 
     return sequences
 
-def assess_sequence_quality(sequences):
+# Motifs used by the mock functional prediction
+FUNCTIONAL_MOTIFS = {
+    "Carbohydrate metabolism": b"GG",
+    "Amino acid metabolism": b"AAA",
+    "Lipid metabolism": b"CCC",
+    "Energy metabolism": b"TTT",
+    "Genetic information processing": b"GGG",
+    "Environmental adaptation": b"ATA"
+}
+
+def compute_seq_features(sequences):
+    """
+    Scan all sequences once and return per-sequence feature arrays (lengths, G+C
+    counts, functional motif presence) plus the pooled base composition
+    """
+    lengths = np.fromiter((len(seq) for seq in sequences.values()), dtype=np.int64, count=len(sequences))
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    buf = np.frombuffer(''.join(sequences.values()).encode('ascii', 'replace'), dtype=np.uint8)
+
+    # Nucleotide composition in first-seen order, matching Counter over the joined string
+    values, first_seen, counts = np.unique(buf, return_index=True, return_counts=True)
+    order = np.argsort(first_seen)
+    base_counts = {chr(v): c for v, c in zip(values[order].tolist(), counts[order].tolist())}
+
+    # Per-sequence G+C counts from a running total over the pooled buffer
+    gc_running = np.concatenate(([0], np.cumsum(_GC_LUT[buf], dtype=np.int64)))
+    gc_counts = gc_running[ends] - gc_running[starts]
+
+    # A motif hit counts for the sequence it starts in only if it ends there too
+    motifs = {}
+    for name, motif in FUNCTIONAL_MOTIFS.items():
+        hits = np.ones(max(buf.size - len(motif) + 1, 0), dtype=bool)
+        for offset, base in enumerate(motif):
+            hits &= buf[offset:offset + hits.size] == base
+        positions = np.flatnonzero(hits)
+        owners = np.searchsorted(ends, positions, side='right')
+        inside = positions + len(motif) <= ends[owners]
+        present = np.zeros(len(lengths), dtype=bool)
+        present[owners[inside]] = True
+        motifs[name] = present
+
+    # Distinct 4-mers: pack each 4-byte window into a uint32 and drop windows that
+    # run past the end of their sequence
+    windows = max(buf.size - 3, 0)
+    kmer_codes = np.zeros(windows, dtype=np.uint32)
+    for offset in range(4):
+        kmer_codes = (kmer_codes << np.uint32(8)) | buf[offset:offset + windows]
+    window_ends = np.repeat(ends, lengths)[:windows]
+    in_sequence = np.arange(4, windows + 4) <= window_ends
+    unique_4mers = int(np.unique(kmer_codes[in_sequence]).size)
+
+    return {
+        "lengths": lengths,
+        "gc_counts": gc_counts,
+        "motifs": motifs,
+        "unique_4mers": unique_4mers,
+        "base_counts": base_counts,
+        "total_bases": int(buf.size)
+    }
+
+def assess_sequence_quality(sequences, features=None):
     """Assess sequence quality metrics"""
     if not sequences:
         return {"error": "No sequences to analyze"}
+    if features is None:
+        features = compute_seq_features(sequences)
 
-    seq_lengths = [len(seq) for seq in sequences.values()]
-    all_sequences = ''.join(sequences.values())
+    seq_lengths = features["lengths"].tolist()
 
     # Nucleotide composition
-    total_bases = len(all_sequences)
-    base_counts = Counter(all_sequences)
+    total_bases = features["total_bases"]
+    base_counts = features["base_counts"]
 
     gc_content = (base_counts.get('G', 0) + base_counts.get('C', 0)) / total_bases * 100
 
     # Sequence complexity (simplified)
-    unique_kmers = set()
-    for seq in sequences.values():
-        for i in range(len(seq) - 3):
-            unique_kmers.add(seq[i:i+4])
-
-    complexity_score = len(unique_kmers) / (len(sequences) * max(1, max(seq_lengths) - 3))
+    complexity_score = features["unique_4mers"] / (len(sequences) * max(1, max(seq_lengths) - 3))
 
     # Quality score distribution (mock)
     quality_scores = np.random.normal(35, 5, len(sequences))
@@ -143,8 +231,11 @@ def assess_sequence_quality(sequences):
         }
     }
 
-def generate_taxonomic_profile(sequences):
+def generate_taxonomic_profile(sequences, features=None):
     """Generate mock taxonomic profile based on sequence patterns"""
+    if features is None:
+        features = compute_seq_features(sequences)
+
     # Mock taxonomic classification based on sequence characteristics
     phyla = {
         "Bacteroidetes": 0,
@@ -155,10 +246,9 @@ def generate_taxonomic_profile(sequences):
         "Others": 0
     }
 
-    for seq_id, sequence in sequences.items():
-        # Simple classification based on GC content and sequence patterns
-        gc_content = (sequence.count('G') + sequence.count('C')) / len(sequence)
-
+    # Simple classification based on GC content and sequence patterns
+    gc_fractions = features["gc_counts"] / features["lengths"]
+    for gc_content in gc_fractions.tolist():
         if gc_content > 0.6:
             phyla["Actinobacteria"] += 1
         elif gc_content > 0.5:
@@ -182,25 +272,30 @@ def generate_taxonomic_profile(sequences):
         "diversity_index": round(len([p for p in phyla.values() if p > 0]) / len(phyla), 2)
     }
 
-def calculate_diversity_metrics(sequences):
+def calculate_diversity_metrics(sequences, features=None):
     """Calculate basic diversity metrics"""
     if not sequences:
         return {"error": "No sequences for diversity analysis"}
+    if features is None:
+        features = compute_seq_features(sequences)
 
     # Species richness
     species_richness = len(sequences)
 
     # Shannon diversity index (simplified)
-    sequence_lengths = [len(seq) for seq in sequences.values()]
-    proportions = np.array(sequence_lengths) / sum(sequence_lengths)
+    sequence_lengths = features["lengths"]
+    proportions = sequence_lengths / sequence_lengths.sum()
 
     shannon_index = -np.sum(proportions * np.log(proportions))
 
     # Evenness
     evenness = shannon_index / np.log(species_richness) if species_richness > 1 else 0
 
-    # Chao1 estimator (simplified)
-    chao1 = species_richness + (len([s for s in sequences.values() if sequence_lengths.count(len(s)) == 1]) ** 2) / (2 * len([s for s in sequences.values() if sequence_lengths.count(len(s)) == 2]))
+    # Chao1 estimator (simplified): sequences whose length occurs once / twice
+    _, length_counts = np.unique(sequence_lengths, return_counts=True)
+    singletons = int(np.sum(length_counts == 1))
+    doubletons = 2 * int(np.sum(length_counts == 2))
+    chao1 = species_richness + singletons ** 2 / (2 * doubletons)
 
     return {
         "species_richness": species_richness,
@@ -215,76 +310,118 @@ def perform_otu_clustering(sequences):
     if not sequences:
         return {"error": "No sequences for OTU clustering"}
 
-    # Simple clustering based on sequence similarity (97% identity threshold)
-    otus = {}
-    otu_id = 1
-
-    for seq_id, sequence in sequences.items():
-        assigned = False
+    # Greedy clustering by sequence similarity (97% identity threshold). MinHash LSH
+    # narrows each comparison to sequences sharing a band; candidates are then checked
+    # with the exact similarity, so only the candidate search is approximate
+    seqs = list(sequences.values())
+    # Encode every sequence once; all similarity checks below work on these arrays
+    encoded = [_encode_sequence(seq) for seq in seqs]
+    band_keys = [
+        _lsh_band_keys(enc[:MINHASH_PREFIX]) if enc.size >= MINHASH_PREFIX else None
+        for enc in encoded
+    ]
+    # Sequences shorter than the prefix have no signature and are always compared
+    unhashed = [i for i, keys in enumerate(band_keys) if keys is None]
+
+    representatives = []
+    rep_buckets = defaultdict(list)
+    unhashed_reps = []
+
+    for i, keys in enumerate(band_keys):
+        if keys is None:
+            candidates = range(len(representatives))
+        else:
+            candidates = {r for key in keys for r in rep_buckets.get(key, ())}
+            candidates.update(unhashed_reps)
 
-        # Check against existing OTUs
-        for otu_seq in otus.values():
-            similarity = calculate_sequence_similarity(sequence, otu_seq)
-            if similarity >= 0.97:  # 97% identity threshold
-                assigned = True
-                break
+        assigned = any(
+            _encoded_similarity(encoded[i], encoded[representatives[r]]) >= OTU_IDENTITY_THRESHOLD
+            for r in candidates
+        )
 
         if not assigned:
-            otus[f"OTU_{otu_id}"] = sequence
-            otu_id += 1
+            r = len(representatives)
+            representatives.append(i)
+            if keys is None:
+                unhashed_reps.append(r)
+            else:
+                for key in keys:
+                    rep_buckets[key].append(r)
+
+    # Calculate OTU abundance by probing an index of all sequences with each representative
+    seq_buckets = defaultdict(list)
+    for i, keys in enumerate(band_keys):
+        for key in keys or ():
+            seq_buckets[key].append(i)
 
-    # Calculate OTU abundance
     otu_abundance = {}
-    for otu_name, otu_seq in otus.items():
-        count = 0
-        for seq in sequences.values():
-            if calculate_sequence_similarity(seq, otu_seq) >= 0.97:
-                count += 1
-        otu_abundance[otu_name] = count
+    for otu_id, rep in enumerate(representatives, start=1):
+        keys = band_keys[rep]
+        if keys is None:
+            candidates = range(len(seqs))
+        else:
+            candidates = {j for key in keys for j in seq_buckets[key]}
+            candidates.update(unhashed)
+        otu_abundance[f"OTU_{otu_id}"] = sum(
+            1 for j in candidates
+            if _encoded_similarity(encoded[j], encoded[rep]) >= OTU_IDENTITY_THRESHOLD
+        )
 
     return {
-        "total_otus": len(otus),
+        "total_otus": len(representatives),
         "otu_abundance": otu_abundance,
         "singleton_otus": len([count for count in otu_abundance.values() if count == 1]),
         "dominant_otus": sorted(otu_abundance.items(), key=lambda x: x[1], reverse=True)[:5]
     }
 
+def _encode_sequence(sequence):
+    """View a sequence as a uint8 array of its ASCII bases"""
+    return np.frombuffer(sequence.encode('ascii', 'replace'), dtype=np.uint8)
+
+def _kmer_codes(seq_bytes, k=MINHASH_KMER):
+    """Distinct 2-bit packed k-mers of an encoded sequence, skipping k-mers with ambiguous bases"""
+    enc = _BASE_CODES[seq_bytes]
+    n = len(enc) - k + 1
+    if n <= 0:
+        return np.empty(0, dtype=np.uint64)
+
+    codes = np.zeros(n, dtype=np.uint64)
+    for j in range(k):
+        codes = (codes << np.uint64(2)) | enc[j:j + n]
+
+    ambiguous = np.concatenate(([0], np.cumsum(enc > 3)))
+    valid = ambiguous[k:] == ambiguous[:n]
+    return np.unique(codes[valid])
+
+def _lsh_band_keys(seq_bytes):
+    """MinHash an encoded sequence's k-mers and return one hashable key per LSH band"""
+    codes = _kmer_codes(seq_bytes)
+    if codes.size == 0:
+        return None
+
+    hashes = (_MINHASH_A[:, None] * codes[None, :] + _MINHASH_B[:, None]) % _MINHASH_PRIME
+    bands = hashes.min(axis=1).reshape(-1, MINHASH_BAND_ROWS)
+    return [(band, *values) for band, values in enumerate(bands.tolist())]
+
 def calculate_sequence_similarity(seq1, seq2):
     """Calculate sequence similarity (simple hamming distance)"""
-    if len(seq1) != len(seq2):
-        # For different lengths, use shorter sequence
-        min_len = min(len(seq1), len(seq2))
-        seq1, seq2 = seq1[:min_len], seq2[:min_len]
+    return _encoded_similarity(_encode_sequence(seq1), _encode_sequence(seq2))
 
-    matches = sum(1 for a, b in zip(seq1, seq2) if a == b)
-    return matches / len(seq1) if seq1 else 0
+def _encoded_similarity(enc1, enc2):
+    """Fraction of matching positions between two encoded sequences"""
+    # For different lengths, use shorter sequence
+    min_len = min(enc1.size, enc2.size)
+    if not min_len:
+        return 0
+    return np.count_nonzero(enc1[:min_len] == enc2[:min_len]) / min_len
 
-def predict_functional_profile(sequences):
+def predict_functional_profile(sequences, features=None):
     """Predict functional profile based on sequence patterns"""
-    # Mock functional prediction
-    functions = {
-        "Carbohydrate metabolism": 0,
-        "Amino acid metabolism": 0,
-        "Lipid metabolism": 0,
-        "Energy metabolism": 0,
-        "Genetic information processing": 0,
-        "Environmental adaptation": 0
-    }
+    if features is None:
+        features = compute_seq_features(sequences)
 
-    for sequence in sequences.values():
-        # Simple pattern-based classification
-        if 'GG' in sequence:
-            functions["Carbohydrate metabolism"] += 1
-        if 'AAA' in sequence:
-            functions["Amino acid metabolism"] += 1
-        if 'CCC' in sequence:
-            functions["Lipid metabolism"] += 1
-        if 'TTT' in sequence:
-            functions["Energy metabolism"] += 1
-        if 'GGG' in sequence:
-            functions["Genetic information processing"] += 1
-        if 'ATA' in sequence:
-            functions["Environmental adaptation"] += 1
+    # Mock functional prediction: sequences containing each category's motif
+    functions = {name: int(present.sum()) for name, present in features["motifs"].items()}
 
     # Convert to relative abundance
     total = sum(functions.values())
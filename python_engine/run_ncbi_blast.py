@@ -1,38 +1,153 @@
 # python_engine/run_ncbi_blast.py
+import io
+import re
 import sys
 import json
-from Bio.Blast import NCBIWWW, NCBIXML
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from Bio.Blast import NCBIXML
+
+BLAST_URL = "https://blast.ncbi.nlm.nih.gov/Blast.cgi"
+# NCBI rejects URL-API submissions larger than this, so big batches are split
+MAX_SUBMISSION_BYTES = 8 * 1024 * 1024
+# Status polling backs off from 10 s to at most 60 s between checks
+POLL_INITIAL_S = 10
+POLL_MAX_S = 60
+# Every HTTP call gets (connect, read) timeouts, and a search that is still WAITING after
+# MAX_WAIT_S of polling is abandoned with TimeoutError
+REQUEST_TIMEOUT = (10, 120)
+MAX_WAIT_S = 30 * 60
+
+_RID_RE = re.compile(r"^\s*RID = (\S+)", re.MULTILINE)
+_STATUS_RE = re.compile(r"\s+Status=(\w+)")
+
+_session = None
+
+def _get_session() -> requests.Session:
+    """Shared keep-alive session so repeated submissions and polls reuse connections."""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        _session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=8))
+    return _session
+
+def _submit(fasta: str) -> str:
+    """Submit a (multi-)FASTA megablast search against nt and return its request ID."""
+    response = _get_session().post(BLAST_URL, data={
+        "CMD": "Put",
+        "PROGRAM": "blastn",
+        "DATABASE": "nt",
+        "MEGABLAST": "on",
+        "HITLIST_SIZE": 1,
+        "QUERY": fasta
+    }, timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    match = _RID_RE.search(response.text)
+    if not match:
+        raise RuntimeError("NCBI BLAST did not return a request ID")
+    return match.group(1)
+
+def _wait_for_results(rid: str, max_wait: float = MAX_WAIT_S) -> str:
+    """
+    Poll with exponential backoff until the search is ready, then fetch the XML.
+    Raises TimeoutError if the search is not ready within max_wait seconds.
+    """
+    session = _get_session()
+    delay = POLL_INITIAL_S
+    deadline = time.monotonic() + max_wait
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"NCBI BLAST search {rid} not ready after {max_wait} s")
+        time.sleep(min(delay, remaining))
+        response = session.get(BLAST_URL, params={"CMD": "Get", "FORMAT_OBJECT": "SearchInfo", "RID": rid},
+                               timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        match = _STATUS_RE.search(response.text)
+        status = match.group(1) if match else "UNKNOWN"
+        if status == "READY":
+            break
+        if status != "WAITING":
+            raise RuntimeError(f"NCBI BLAST search {rid} ended with status {status}")
+        delay = min(delay * 2, POLL_MAX_S)
+
+    response = session.get(BLAST_URL, params={"CMD": "Get", "FORMAT_TYPE": "XML", "RID": rid},
+                           timeout=REQUEST_TIMEOUT)
+    response.raise_for_status()
+    return response.text
+
+def _query_name(record):
+    """The query_<i> name of a BLAST record, from its definition line or its query ID"""
+    for name in (*record.query.split()[:1], record.query_id or ""):
+        name = name.removeprefix("lcl|")
+        if name.startswith("query_"):
+            return name
+    return None
+
+def _summarize(record) -> dict:
+    """Turn one BLAST record into the result dict returned to the backend."""
+    if record is not None and record.descriptions:
+        best_hit = record.descriptions[0]
+        return {
+            "status": "success",
+            "message": "Match found on NCBI.",
+            "best_hit_title": best_hit.title,
+            "score": best_hit.score,
+            "e_value": best_hit.e
+        }
+    return {
+        "status": "success",
+        "message": "No significant match found on NCBI."
+    }
+
+def _fasta_batches(sequences: list):
+    """Yield (indices, multi-FASTA) chunks that each fit in one submission."""
+    indices, entries, size = [], [], 0
+    for i, sequence in enumerate(sequences):
+        entry = f">query_{i}\n{sequence}\n"
+        if entries and size + len(entry) > MAX_SUBMISSION_BYTES:
+            yield indices, "".join(entries)
+            indices, entries, size = [], [], 0
+        indices.append(i)
+        entries.append(entry)
+        size += len(entry)
+    if entries:
+        yield indices, "".join(entries)
+
+def verify_batch_on_ncbi(sequences: list) -> list:
+    """
+    Verifies many sequences with as few live BLAST searches as possible: queries are
+    submitted together as multi-FASTA, so the whole batch waits on one NCBI round
+    trip instead of one per sequence. Results are returned in input order.
+    """
+    results = [None] * len(sequences)
+    for indices, fasta in _fasta_batches(sequences):
+        try:
+            print(f"--- Calling Live NCBI Web BLAST API for {len(indices)} sequences ---")
+            xml = _wait_for_results(_submit(fasta))
+            records = list(NCBIXML.parse(io.StringIO(xml)))
+            if len(records) != len(indices):
+                raise RuntimeError(f"NCBI BLAST returned {len(records)} results for {len(indices)} queries")
+            # Match by the echoed query name where NCBI kept it, else by submission order
+            by_name = {_query_name(record): record for record in records}
+            for i, record in zip(indices, records):
+                results[i] = _summarize(by_name.get(f"query_{i}", record))
+        except Exception as e:
+            for i in indices:
+                results[i] = {"status": "error", "error": str(e)}
+    return results
 
 def verify_on_ncbi(sequence: str):
     """
     Performs a single, live BLAST search against the global NCBI nt database.
     """
-    try:
-        print("--- Calling Live NCBI Web BLAST API ---")
-        result_handle = NCBIWWW.qblast("blastn", "nt", sequence, megablast=True, hitlist_size=1)
-        
-        blast_records = list(NCBIXML.parse(result_handle))
-        
-        if blast_records and blast_records[0].descriptions:
-            best_hit = blast_records[0].descriptions[0]
-            result = {
-                "status": "success",
-                "message": "Match found on NCBI.",
-                "best_hit_title": best_hit.title,
-                "score": best_hit.score,
-                "e_value": best_hit.e
-            }
-        else:
-            result = {
-                "status": "success",
-                "message": "No significant match found on NCBI."
-            }
-        return result
-            
-    except Exception as e:
-        return {"status": "error", "error": str(e)}
+    return verify_batch_on_ncbi([sequence])[0]
 
 if __name__ == "__main__":
-    sequence_to_verify = sys.argv[1]
-    results = verify_on_ncbi(sequence_to_verify)
-    print(json.dumps(results))
\ No newline at end of file
+    sequences_to_verify = sys.argv[1:]
+    if len(sequences_to_verify) == 1:
+        results = verify_on_ncbi(sequences_to_verify[0])
+    else:
+        results = verify_batch_on_ncbi(sequences_to_verify)
+    print(json.dumps(results))
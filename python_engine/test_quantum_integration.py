@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("cachetools")
+
+import quantum_integration
+from quantum_integration import QuantumBiodiversityOptimizer
+
+
+class _KnapsackProgram:
+    """Stand-in for a QuadraticProgram: maximize value (as -value) under a cost budget"""
+
+    def __init__(self, values, costs, budget):
+        self.values, self.costs, self.budget = values, costs, budget
+        self.objective = self
+
+    def get_num_vars(self):
+        return len(self.values)
+
+    def evaluate(self, x):
+        return -sum(v for v, bit in zip(self.values, x) if bit)
+
+    def is_feasible(self, x):
+        return sum(c for c, bit in zip(self.costs, x) if bit) <= self.budget
+
+
+def _greedy_reference(costs, priorities, budget):
+    protected, total = [], 0.0
+    for i in sorted(range(len(costs)), key=lambda i: -(priorities[i] / costs[i])):
+        if total + costs[i] <= budget:
+            protected.append(i)
+            total += costs[i]
+    return protected, total
+
+
+def test_interp_initial_point_orders_betas_before_gammas():
+    point = QuantumBiodiversityOptimizer._interp_initial_point(0.4, 0.8)
+    np.testing.assert_allclose(point, [0.4, 0.2, 0.4, 0.8])
+
+
+def test_interp_initial_point_matches_qaoa_ansatz_parameters():
+    pytest.importorskip("qiskit")
+    from qiskit.circuit.library import QAOAAnsatz
+    from qiskit.quantum_info import SparsePauliOp
+
+    ansatz = QAOAAnsatz(SparsePauliOp("ZZ"), reps=2)
+    names = [parameter.name for parameter in ansatz.parameters]
+    assert names == ["β[0]", "β[1]", "γ[0]", "γ[1]"]
+
+
+def test_best_sampled_solution_decodes_little_endian_and_drops_slack_bits():
+    qp = _KnapsackProgram(values=[3, 1, 2], costs=[2, 1, 2], budget=4)
+    # Last character is variable 0; the leading character is a QUBO slack bit
+    counts = {"1111": 500, "1101": 300, "0011": 100}
+    protected, objective = QuantumBiodiversityOptimizer._best_sampled_solution(qp, counts)
+    # 1111 selects every variable (cost 5, infeasible); of the feasible samples 1101
+    # (variables 0 and 2, value 5) beats 0011 (variables 0 and 1, value 4)
+    assert protected == [0, 2]
+    assert objective == -5.0
+
+
+def test_best_sampled_solution_falls_back_to_most_frequent():
+    qp = _KnapsackProgram(values=[1, 1], costs=[5, 5], budget=1)
+    protected, objective = QuantumBiodiversityOptimizer._best_sampled_solution(qp, {"11": 7, "01": 3})
+    assert protected == [0, 1]
+    assert objective == -2.0
+
+
+def test_best_sampled_solution_reads_virtual_qubits_after_layout():
+    pytest.importorskip("qiskit")
+    from qiskit import QuantumCircuit, transpile
+    from qiskit.primitives import StatevectorSampler
+    from qiskit.transpiler import CouplingMap
+
+    # Variables 0 and 2 set; measured before transpiling onto permuted physical qubits
+    circuit = QuantumCircuit(3)
+    circuit.x([0, 2])
+    circuit.measure_all()
+    placed = transpile(circuit, coupling_map=CouplingMap.from_line(5), initial_layout=[3, 0, 4],
+                       basis_gates=["x", "cx", "rz", "sx"], seed_transpiler=0)
+    counts = StatevectorSampler().run([placed], shots=16).result()[0].data.meas.get_counts()
+
+    qp = _KnapsackProgram(values=[1, 1, 1], costs=[1, 1, 1], budget=3)
+    protected, _ = QuantumBiodiversityOptimizer._best_sampled_solution(qp, counts)
+    assert protected == [0, 2]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_greedy_knapsack_numpy_matches_plain_greedy(seed):
+    rng = np.random.default_rng(seed)
+    costs = rng.uniform(0.5, 3.0, size=40)
+    # Repeated priorities produce ratio ties, which must keep input order
+    priorities = rng.choice([0.2, 0.5, 0.9], size=40)
+    costs[::7] = 1.0
+
+    protected, total = QuantumBiodiversityOptimizer._greedy_knapsack_numpy(costs, priorities, 10.0)
+    expected, expected_total = _greedy_reference(costs.tolist(), priorities.tolist(), 10.0)
+    assert protected == expected
+    assert total == pytest.approx(expected_total)
+
+
+@pytest.mark.skipif(not quantum_integration.NUMBA_AVAILABLE, reason="numba not installed")
+@pytest.mark.parametrize("seed", range(5))
+def test_greedy_knapsack_numba_matches_numpy(seed):
+    rng = np.random.default_rng(seed)
+    costs = rng.uniform(0.5, 3.0, size=40)
+    priorities = rng.choice([0.2, 0.5, 0.9], size=40)
+
+    protected, total = quantum_integration._greedy_knapsack(costs, priorities, 10.0)
+    expected, expected_total = QuantumBiodiversityOptimizer._greedy_knapsack_numpy(costs, priorities, 10.0)
+    assert protected.tolist() == expected
+    assert total == pytest.approx(expected_total)
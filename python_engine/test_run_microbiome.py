@@ -0,0 +1,65 @@
+import numpy as np
+
+from run_microbiome import (
+    OTU_IDENTITY_THRESHOLD,
+    calculate_sequence_similarity,
+    perform_otu_clustering,
+)
+
+
+def _random_sequence(rng, length):
+    return "".join(rng.choice(list("ACGT"), size=length))
+
+
+def _mutate(rng, sequence, n_mutations):
+    bases = list(sequence)
+    for position in rng.choice(len(bases), size=n_mutations, replace=False):
+        bases[position] = "ACGT"[("ACGT".index(bases[position]) + 1) % 4]
+    return "".join(bases)
+
+
+def _exhaustive_otus(sequences):
+    """Greedy clustering comparing every sequence against every representative"""
+    seqs = list(sequences.values())
+    representatives = []
+    for seq in seqs:
+        if not any(calculate_sequence_similarity(seq, rep) >= OTU_IDENTITY_THRESHOLD for rep in representatives):
+            representatives.append(seq)
+    return {
+        f"OTU_{otu_id}": sum(calculate_sequence_similarity(seq, rep) >= OTU_IDENTITY_THRESHOLD for seq in seqs)
+        for otu_id, rep in enumerate(representatives, start=1)
+    }
+
+
+def test_short_read_does_not_split_long_reads():
+    rng = np.random.default_rng(0)
+    long_read = _random_sequence(rng, 1000)
+    # One mismatch near the start, inside the short read's length
+    variant = long_read[:10] + ("A" if long_read[10] != "A" else "C") + long_read[11:]
+    sequences = {
+        "a": long_read,
+        "b": variant,
+        "short": _random_sequence(rng, 20),
+    }
+    result = perform_otu_clustering(sequences)
+    assert result["otu_abundance"] == {"OTU_1": 2, "OTU_2": 1}
+
+
+def test_truncated_reads_join_their_centroid():
+    rng = np.random.default_rng(1)
+    centroid = _random_sequence(rng, 300)
+    sequences = {"centroid": centroid}
+    for i, length in enumerate(rng.integers(10, 300, size=50)):
+        sequences[f"prefix_{i}"] = centroid[:length]
+    result = perform_otu_clustering(sequences)
+    assert result["otu_abundance"] == {"OTU_1": 51}
+
+
+def test_mixed_read_lengths_match_exhaustive_clustering():
+    rng = np.random.default_rng(2)
+    centroids = [_random_sequence(rng, 400) for _ in range(8)]
+    sequences = {}
+    for i in range(300):
+        read = _mutate(rng, centroids[rng.integers(len(centroids))], int(rng.integers(0, 10)))
+        sequences[f"read_{i}"] = read[:int(rng.integers(10, 401))]
+    assert perform_otu_clustering(sequences)["otu_abundance"] == _exhaustive_otus(sequences)